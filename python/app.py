@@ -2,13 +2,16 @@ import os
 
 from database import (
     Position,
+    db,
     init_db,
 )
 from dotenv import load_dotenv
 from error_routes import error_routes
+from fanout import message_queue_options
 from flask import (
     Flask,
     Response,
+    abort,
     g,
     json,
     render_template,
@@ -17,23 +20,31 @@ from flask import (
     stream_with_context,
     url_for,
 )
+from flask_pydantic import validate
 from flask_socketio import SocketIO, emit, join_room
 from item_routes import item_routes
+from jobs import init_job_reporter
+from mail_outbox import init_mail_dispatcher
 from procurement_routes import procurement_routes
 from report_routes import report_routes
-from rfq_routes import rfq_routes
-from scrap_gred import init_scraper
-from user_routes import user_routes
+from rfq_routes import RFQ_MAIL_JOB, report_rfq_mail, rfq_routes
+from user_routes import init_user_directory, user_routes
 from utils import (
     SocketDataKey,
     check_token,
+    data_change_log,
     init_logger,
     init_mail,
     on_ajax_render,
     openai_response,
     require_fields,
+    response_cache,
+    token_cache,
 )
-from vendor_routes import vendor_routes
+from vendor_routes import report_assessment, vendor_routes
+
+from python.response import DataResponse
+from python.schema import ResyncQuery
 
 load_dotenv()
 
@@ -41,7 +52,28 @@ app = Flask(__name__, template_folder="../dist", static_folder="../dist/static")
 init_logger(app)
 init_mail(app)
 init_db(app)
-init_scraper(app)
+
+
+def init_background_tasks():
+    """
+    Starts the per-worker background greenlets. Under uWSGI the app is loaded
+    in the master before it forks, so they are started in each worker after the
+    fork, which also drops the database connections inherited from the master.
+    """
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+    init_job_reporter(app, {"assess_vendor": report_assessment})
+    init_mail_dispatcher(app, {RFQ_MAIL_JOB: report_rfq_mail})
+    init_user_directory(app)
+
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    init_background_tasks()
+else:
+    postfork(init_background_tasks)
 
 app.config["SERVER_NAME"] = (
     os.environ["PROD_SERVER_NAME"]
@@ -61,6 +93,7 @@ socketio = SocketIO(
     # maxHttpBufferSize=1e8,
     transports=["polling", "websocket"],
     debug=True,
+    **message_queue_options(os.environ.get("SOCKETIO_MESSAGE_QUEUE")),
 )
 
 
@@ -133,6 +166,34 @@ def users():
     return render_template("index.html", redirect_url="/dashboard/users")
 
 
+@app.route("/get_cache_metrics", methods=["GET"])
+@check_token(Position.admin)
+def get_cache_metrics():
+    return DataResponse(
+        data={"token": token_cache.stats(), "response": response_cache.stats()}
+    ).to_response()
+
+
+@app.route("/resync_data/<dtype>", methods=["GET"])
+@check_token()
+@validate()
+def resync_data(dtype, query: ResyncQuery):
+    """
+    Returns the data-change events of `dtype` after sequence number `since`,
+    or asks the client to reload the data when they are no longer logged.
+    """
+    if dtype not in SocketDataKey.__members__:
+        abort(404)
+    if Position[g.user["role"]].value < SocketDataKey[dtype].value.value:
+        abort(403)
+
+    seq, events = data_change_log.since(dtype, query.since)
+    if events is None:
+        return DataResponse(data={"seq": seq, "reset": True}).to_response()
+
+    return DataResponse(data={"seq": seq, "events": events}).to_response()
+
+
 @app.route("/consult", methods=["POST"])
 @require_fields(["input"])
 def consult(data):
@@ -167,7 +228,7 @@ def consult(data):
 
 @socketio.on("connect", namespace="/data")
 @check_token()
-def handle_connect():
+def handle_connect(auth=None):
     valid_keys = [
         key
         for key, role in SocketDataKey.__members__.items()
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+import time
+
+from database import ASSESSMENT_INSTANCE_BASE, gen, init_db
+from dotenv import load_dotenv
+from flask import Flask
+from googlemaps import driver_pool
+from jobs import JOB_POLL_INTERVAL, job_queue
+from scrap_gred import assess_vendor, get_sentiment_analyzer, init_scraper
+from utils import init_logger
+
+load_dotenv()
+
+ASSESSMENT_WORKERS = int(os.environ.get("ASSESSMENT_WORKERS", 2))
+
+handlers = {
+    "assess_vendor": lambda app, payload: assess_vendor(
+        payload["id"], payload["name"], payload["address"], app.app_context()
+    ),
+}
+
+
+def work(index):
+    """Runs queued jobs one at a time until the process is terminated."""
+    gen.configure(ASSESSMENT_INSTANCE_BASE + index)
+
+    app = Flask(__name__)
+    init_logger(app)
+    init_db(app)
+    get_sentiment_analyzer()
+    driver_pool.warm()
+
+    while True:
+        job = job_queue.claim(list(handlers))
+        if job is None:
+            # Free the warm browsers once the queue has been idle long enough
+            driver_pool.reap()
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+
+        app.logger.debug(f"Running job {job['id']} ({job['kind']}: {job['key']})")
+        try:
+            handlers[job["kind"]](app, job["payload"])
+        except Exception as e:
+            app.logger.exception(f"Job {job['id']} failed: {e}")
+            job_queue.fail(job["id"], e)
+        else:
+            job_queue.complete(job["id"])
+
+
+def main():
+    app = Flask(__name__)
+    init_logger(app)
+    init_scraper(app)
+    job_queue.requeue_running(list(handlers))
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=work, args=(index,))
+        for index in range(ASSESSMENT_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    app.logger.info(f"Started {ASSESSMENT_WORKERS} assessment worker(s)")
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+from urllib.parse import urlencode
+
+from flask import current_app, url_for
+
+
+def render_many(template_name, contexts, **shared):
+    """
+    Renders `template_name` once per context. The template is compiled and the
+    shared context (including the context processors) is built only once, and
+    the results are yielded lazily so they can be streamed to their consumer.
+    """
+    app = current_app._get_current_object()
+    template = app.jinja_env.get_template(template_name)
+    base = dict(shared)
+    app.update_template_context(base)
+
+    for context in contexts:
+        yield template.render({**base, **context})
+
+
+def url_builder(endpoint, **values):
+    """
+    Returns a function building the external URL of `endpoint` with extra query
+    arguments, resolving the route only once.
+    """
+    base = url_for(endpoint, _external=True, **values)
+    separator = "&" if "?" in base else "?"
+    return lambda **query: f"{base}{separator}{urlencode(query)}"
+
+
+if __name__ == "__main__":
+    import os
+    import time
+
+    from flask import Flask, render_template
+
+    recipients = [
+        {"token": f"token-{i}", "vendor": f"Vendor {i}"} for i in range(1_000)
+    ]
+
+    app = Flask(
+        __name__,
+        template_folder=os.path.join(os.path.dirname(__file__), "../src/templates"),
+    )
+    app.config["SERVER_NAME"] = "localhost:5000"
+    app.add_url_rule("/view_rfq", "view_rfq", lambda: "")
+
+    with app.app_context():
+        render_template("rfq_email.html")
+
+        start = time.perf_counter()
+        for recipient in recipients:
+            render_template(
+                "rfq_email.html",
+                rfq_link=url_for("view_rfq", token=recipient["token"], _external=True),
+                vendor=recipient["vendor"],
+            )
+        render_template_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        rfq_link = url_builder("view_rfq")
+        for _ in render_many(
+            "rfq_email.html",
+            (
+                {
+                    "rfq_link": rfq_link(token=recipient["token"]),
+                    "vendor": recipient["vendor"],
+                }
+                for recipient in recipients
+            ),
+        ):
+            pass
+        render_many_time = time.perf_counter() - start
+
+    print(f"render_template: {render_template_time:.3f}s")
+    print(f"render_many:     {render_many_time:.3f}s")
+    print(f"speedup:         {render_template_time / render_many_time:.1f}x")
@@ -4,8 +4,27 @@ from datetime import datetime
 
 from flask_sqlalchemy import SQLAlchemy
 from snowflake import SnowflakeGenerator
-from sqlalchemy import Column, Enum, Integer, String, Table, text
-from sqlalchemy.orm import DeclarativeBase, Mapped, class_mapper, mapped_column
+from sqlalchemy import (
+    Column,
+    Enum,
+    Index,
+    Integer,
+    String,
+    Table,
+    case,
+    delete,
+    insert,
+    select,
+    text,
+    tuple_,
+)
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    class_mapper,
+    mapped_column,
+    selectinload,
+)
 from sqlalchemy.orm._orm_constructors import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.sql.schema import ForeignKey
@@ -17,7 +36,50 @@ class Base(DeclarativeBase):
 
 db = SQLAlchemy(model_class=Base)
 
-gen = SnowflakeGenerator(42)
+# Instance ids from this offset are left to the assessment worker processes
+ASSESSMENT_INSTANCE_BASE = 512
+
+
+class ProcessSnowflakeGenerator:
+    """
+    Snowflake id generator with an instance id of its own in every process.
+    Processes forked after import, such as the uWSGI workers, get a fresh
+    generator instead of sharing the parent's state and instance id.
+    """
+
+    def __init__(self):
+        self.instance = None
+        self.pid = None
+        self.generator = None
+
+    def configure(self, instance):
+        """Sets the instance id of this process, e.g. from its worker index."""
+        self.instance = instance
+        self.pid = None
+
+    def instance_id(self):
+        if self.instance is not None:
+            return self.instance
+
+        try:
+            import uwsgi
+
+            # Web workers are numbered from 1, the master is 0
+            return uwsgi.worker_id()
+        except ImportError:
+            return os.getpid() % ASSESSMENT_INSTANCE_BASE
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.generator = SnowflakeGenerator(self.instance_id())
+        return next(self.generator)
+
+
+gen = ProcessSnowflakeGenerator()
 
 
 class BaseModel(Base):
@@ -119,12 +181,37 @@ class Vendor(BaseModel, db.Model):
         "Review", back_populates="vendor", cascade="all, delete-orphan"
     )
 
-    def as_dict(self):
+    @classmethod
+    def with_payload(cls):
+        """Returns a vendor query that eagerly loads everything `as_summary` touches."""
+        return cls.query.options(selectinload(cls.categories))
+
+    @classmethod
+    def summaries(cls, vendors):
+        """
+        Returns the summaries of `vendors`, with their review count, average
+        rating and latest review date aggregated in a single query.
+        """
+        stats = {
+            row.vendor_id: row
+            for row in db.session.query(
+                Review.vendor_id,
+                func.count(Review.id).label("review_count"),
+                func.avg(Review.rating).label("average_rating"),
+                func.max(Review.date).label("latest_review"),
+            )
+            .filter(Review.vendor_id.in_([vendor.id for vendor in vendors]))
+            .group_by(Review.vendor_id)
+        }
+        return [vendor.as_summary(stats.get(vendor.id)) for vendor in vendors]
+
+    def as_summary(self, stats=None):
         data = super().as_dict()
         categories = getattr(self, "categories", [])
         data["categories"] = [category.name for category in categories]
-        reviews = getattr(self, "reviews", [])
-        data["reviews"] = [review.as_dict() for review in reviews]
+        data["review_count"] = stats.review_count if stats else 0
+        data["average_rating"] = float(stats.average_rating) if stats else None
+        data["latest_review"] = stats.latest_review if stats else None
         return data
 
 
@@ -135,13 +222,28 @@ class Review(BaseModel, db.Model):
         db.String(128), primary_key=True, insert_default=lambda: next(gen)
     )
     vendor_id: Mapped[int] = mapped_column(db.String(128), db.ForeignKey("vendor.id"))
+    source_id: Mapped[str] = mapped_column(db.String(256), nullable=True)
     rating: Mapped[float] = mapped_column(db.Float, nullable=False)
     caption: Mapped[str] = mapped_column(db.String(4096), nullable=True)
     date: Mapped[datetime] = mapped_column(db.DateTime, nullable=False)
+    sentiment_label: Mapped[str] = mapped_column(db.String(32), nullable=True)
+    sentiment_score: Mapped[float] = mapped_column(db.Float, nullable=True)
 
     vendor = relationship("Vendor", back_populates="reviews")
 
 
+class SentimentCache(BaseModel, db.Model):
+    __tablename__ = "sentiment_cache"
+
+    review_id: Mapped[str] = mapped_column(db.String(256), primary_key=True)
+    caption_hash: Mapped[str] = mapped_column(db.String(64), primary_key=True)
+    label: Mapped[str] = mapped_column(db.String(32), nullable=False)
+    score: Mapped[float] = mapped_column(db.Float, nullable=False)
+    last_used: Mapped[datetime] = mapped_column(
+        db.DateTime, nullable=False, server_default=func.now(), index=True
+    )
+
+
 class Procurement(BaseModel, db.Model):
     __tablename__ = "procurement"
 
@@ -227,6 +329,13 @@ class RFQStatus(enum.Enum):
     ORDERED = "ordered"
 
 
+class MailStatus(enum.Enum):
+    QUEUED = "queued"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
 class RFQ(BaseModel, db.Model):
     __tablename__ = "rfq"
 
@@ -241,6 +350,7 @@ class RFQ(BaseModel, db.Model):
     status: Mapped[RFQStatus] = mapped_column(
         Enum(RFQStatus), nullable=False, default=RFQStatus.ENABLED
     )
+    mail_status: Mapped[MailStatus] = mapped_column(Enum(MailStatus), nullable=True)
 
     procurement_id: Mapped[str] = mapped_column(
         db.String(128), ForeignKey("procurement.id", ondelete="CASCADE"), nullable=False
@@ -263,9 +373,174 @@ class RFQ(BaseModel, db.Model):
         vendor = getattr(self, "vendor", None)
         data["vendor_name"] = vendor.name if vendor else None
         data["status"] = self.status.value
+        data["mail_status"] = self.mail_status.value if self.mail_status else None
         return data
 
 
+class OutboxMail(BaseModel, db.Model):
+    """
+    Email waiting to be sent, written in the transaction of the rows it is
+    about so that neither exists without the other.
+    """
+
+    __tablename__ = "outbox_mail"
+    __table_args__ = (Index("ix_outbox_mail_pending", "status", "available_at"),)
+
+    id: Mapped[int] = mapped_column(
+        db.String(128), primary_key=True, insert_default=lambda: next(gen)
+    )
+    kind: Mapped[str] = mapped_column(db.String(64), nullable=False)
+    key: Mapped[str] = mapped_column(db.String(128), nullable=False)
+    subject: Mapped[str] = mapped_column(db.String(256), nullable=False)
+    recipients: Mapped[list] = mapped_column(db.JSON, nullable=False)
+    html: Mapped[str] = mapped_column(db.Text, nullable=False)
+    status: Mapped[MailStatus] = mapped_column(
+        Enum(MailStatus), nullable=False, default=MailStatus.QUEUED
+    )
+    attempts: Mapped[int] = mapped_column(db.Integer, nullable=False, default=0)
+    error: Mapped[str] = mapped_column(db.String(1024), nullable=True)
+    available_at: Mapped[datetime] = mapped_column(
+        db.DateTime, nullable=False, default=datetime.now
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        db.DateTime, nullable=False, default=datetime.now
+    )
+
+
+class VendorSuggestion(BaseModel, db.Model):
+    """Materialized ranking of the vendors suggested for each category."""
+
+    __tablename__ = "vendor_suggestion"
+    __table_args__ = (
+        Index(
+            "ix_vendor_suggestion_rank",
+            "category_id",
+            "gred",
+            "approved",
+            "response_rate",
+        ),
+    )
+
+    category_id: Mapped[int] = mapped_column(
+        ForeignKey("category.id", ondelete="CASCADE"), primary_key=True
+    )
+    vendor_id: Mapped[str] = mapped_column(
+        db.String(128), ForeignKey("vendor.id", ondelete="CASCADE"), primary_key=True
+    )
+    name: Mapped[str] = mapped_column(db.String(150), nullable=True)
+    gred: Mapped[float] = mapped_column(db.Float, nullable=False)
+    approved: Mapped[bool] = mapped_column(db.Boolean, nullable=False)
+    rfq_total: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    rfq_responded: Mapped[int] = mapped_column(db.Integer, nullable=False)
+    response_rate: Mapped[float] = mapped_column(db.Float, nullable=False)
+
+    @classmethod
+    def ranked(cls, category_id, limit):
+        """Returns the top `limit` scored vendors of a category, best first."""
+        return (
+            cls.query.filter(cls.category_id == category_id, cls.gred > 0)
+            .order_by(cls.gred.desc(), cls.approved.desc(), cls.response_rate.desc())
+            .limit(limit)
+        )
+
+
+def refresh_vendor_suggestions(vendor_ids=None):
+    """
+    Rebuilds the suggestion rows of the given vendors (all when None) from
+    their categories, GRED, approval and RFQ response history, in the current
+    transaction.
+    """
+    db.session.flush()
+
+    rfq_counts = (
+        select(
+            RFQ.vendor_id,
+            func.count(RFQ.id).label("rfq_total"),
+            func.sum(case((RFQ.response_time.isnot(None), 1), else_=0)).label(
+                "rfq_responded"
+            ),
+        )
+        .group_by(RFQ.vendor_id)
+        .subquery()
+    )
+    rfq_total = func.coalesce(rfq_counts.c.rfq_total, 0)
+    rfq_responded = func.coalesce(rfq_counts.c.rfq_responded, 0)
+
+    rows = (
+        select(
+            vendor_category_association.c.category_id,
+            Vendor.id,
+            Vendor.name,
+            Vendor.gred,
+            func.coalesce(Vendor.approved, False),
+            rfq_total,
+            rfq_responded,
+            case((rfq_total > 0, rfq_responded * 1.0 / rfq_total), else_=0),
+        )
+        .join(Vendor, Vendor.id == vendor_category_association.c.vendor_id)
+        .outerjoin(rfq_counts, rfq_counts.c.vendor_id == Vendor.id)
+    )
+    stale = delete(VendorSuggestion)
+
+    if vendor_ids is not None:
+        rows = rows.where(Vendor.id.in_(vendor_ids))
+        stale = stale.where(VendorSuggestion.vendor_id.in_(vendor_ids))
+
+    db.session.execute(stale)
+    db.session.execute(
+        insert(VendorSuggestion).from_select(
+            [
+                "category_id",
+                "vendor_id",
+                "name",
+                "gred",
+                "approved",
+                "rfq_total",
+                "rfq_responded",
+                "response_rate",
+            ],
+            rows,
+        )
+    )
+
+
+def keyset_page(query, column, cursor=None, limit=None, descending=False):
+    """
+    Applies keyset pagination over a unique, numeric string `column` (the
+    snowflake ids), ordered numerically by length and then by value. Returns
+    the page rows and the cursor of the next page, if any.
+    """
+    length = func.length(column)
+    key = tuple_(length, column)
+    if cursor is not None:
+        bound = tuple_(len(cursor), cursor)
+        query = query.filter(key < bound if descending else key > bound)
+
+    if descending:
+        query = query.order_by(length.desc(), column.desc())
+    else:
+        query = query.order_by(length.asc(), column.asc())
+
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    return rows, getattr(rows[-1], column.key)
+
+
+def iter_keyset(query, column, batch_size, descending=False, cursor=None):
+    """Yields every row of `query` by walking it in keyset-paginated batches."""
+    while True:
+        rows, cursor = keyset_page(query, column, cursor, batch_size, descending)
+        yield from rows
+        if cursor is None:
+            return
+
+
 # class Purchase(BaseModel, db.Model):
 #     __tablename__ = "purchase"
 
@@ -349,6 +624,8 @@ def init_db(app):
 
         db.create_all()
         populate_categories()
+        if VendorSuggestion.query.first() is None:
+            refresh_vendor_suggestions()
         db.session.commit()
 
     app.logger.info("Database successfully initialized")
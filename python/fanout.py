@@ -0,0 +1,355 @@
+import json
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+from dotenv import load_dotenv
+from socketio import PubSubManager
+
+load_dotenv()
+
+FANOUT_PATH = os.environ.get("FANOUT_PATH", os.path.join(os.getcwd(), "fanout.sqlite3"))
+FANOUT_POLL_INTERVAL = 0.05
+FANOUT_MESSAGE_RETENTION = 60
+DATA_CHANGE_SNAPSHOT_RETENTION = 7 * 24 * 60 * 60
+
+
+def connect(path):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+@contextmanager
+def transaction(path):
+    conn = connect(path)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield conn
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+class SQLiteManager(PubSubManager):
+    """
+    Socket.IO client manager that shares emits and room operations between
+    the worker processes of a host through a SQLite table, standing in for a
+    Redis message queue.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path=FANOUT_PATH, channel="socketio", write_only=False):
+        super().__init__(channel=channel, write_only=write_only)
+        self.path = path
+
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS message (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    payload BLOB NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS message_created_at ON message (created_at)"
+            )
+
+    def _publish(self, data):
+        now = time.time()
+        with transaction(self.path) as conn:
+            conn.execute(
+                "INSERT INTO message (channel, payload, created_at) VALUES (?, ?, ?)",
+                (self.channel, pickle.dumps(data), now),
+            )
+            conn.execute(
+                "DELETE FROM message WHERE created_at < ?",
+                (now - FANOUT_MESSAGE_RETENTION,),
+            )
+
+    def _listen(self):
+        with closing(connect(self.path)) as conn:
+            last_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM message")
+            last_id = last_id.fetchone()[0]
+
+            while True:
+                messages = conn.execute(
+                    "SELECT id, payload FROM message WHERE id > ? AND channel = ? ORDER BY id",
+                    (last_id, self.channel),
+                ).fetchall()
+
+                for message in messages:
+                    last_id = message["id"]
+                    yield message["payload"]
+
+                self.server.sleep(FANOUT_POLL_INTERVAL)
+
+
+def message_queue_options(url):
+    """
+    Returns the SocketIO options for a message queue URL: "sqlite" selects
+    `SQLiteManager`, anything else (e.g. "redis://") is handed to Flask-SocketIO.
+    """
+    if not url:
+        return {}
+    if url == "sqlite":
+        return {"client_manager": SQLiteManager()}
+    return {"message_queue": url}
+
+
+class SQLiteDataChangeLog:
+    """
+    `DataChangeLog` shared by the worker processes of a host: sequence
+    numbers, logged events and the last broadcast snapshots live in SQLite.
+    """
+
+    def __init__(self, delta, path=FANOUT_PATH, log_size=1000):
+        self.delta = delta
+        self.path = path
+        self.log_size = log_size
+
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS data_change (
+                    dtype TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    event TEXT NOT NULL,
+                    PRIMARY KEY (dtype, seq)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS data_change_snapshot (
+                    dtype TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    item TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (dtype, key)
+                )
+                """
+            )
+
+    def record(self, uid, type, dtype, data):
+        item = json.loads(data)
+        key = json.dumps(item.get("id"))
+        now = time.time()
+
+        with transaction(self.path) as conn:
+            previous = conn.execute(
+                "SELECT item FROM data_change_snapshot WHERE dtype = ? AND key = ?",
+                (dtype, key),
+            ).fetchone()
+            previous = json.loads(previous["item"]) if previous else None
+
+            if type == "delete":
+                conn.execute(
+                    "DELETE FROM data_change_snapshot WHERE dtype = ? AND key = ?",
+                    (dtype, key),
+                )
+            else:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO data_change_snapshot
+                    (dtype, key, item, updated_at) VALUES (?, ?, ?, ?)
+                    """,
+                    (dtype, key, json.dumps(item), now),
+                )
+
+            event = self.delta(uid, type, dtype, item, previous)
+            if event is None:
+                return None
+
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM data_change WHERE dtype = ?",
+                (dtype,),
+            ).fetchone()[0]
+            event["seq"] = seq
+
+            conn.execute(
+                "INSERT INTO data_change (dtype, seq, event) VALUES (?, ?, ?)",
+                (dtype, seq, json.dumps(event)),
+            )
+            conn.execute(
+                "DELETE FROM data_change WHERE dtype = ? AND seq <= ?",
+                (dtype, seq - self.log_size),
+            )
+            conn.execute(
+                "DELETE FROM data_change_snapshot WHERE updated_at < ?",
+                (now - DATA_CHANGE_SNAPSHOT_RETENTION,),
+            )
+
+        return event
+
+    def since(self, dtype, seq=None):
+        with closing(connect(self.path)) as conn:
+            current = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) FROM data_change WHERE dtype = ?",
+                (dtype,),
+            ).fetchone()[0]
+            if seq is None or seq == current:
+                return current, []
+
+            events = [
+                json.loads(row["event"])
+                for row in conn.execute(
+                    "SELECT event FROM data_change WHERE dtype = ? AND seq > ? ORDER BY seq",
+                    (dtype, seq),
+                )
+            ]
+
+        if seq > current or not events or events[0]["seq"] != seq + 1:
+            return current, None
+
+        return current, events
+
+
+class SQLiteDataVersions:
+    """`DataVersions` shared by the worker processes of a host."""
+
+    def __init__(self, path=FANOUT_PATH):
+        self.path = path
+
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS data_version (
+                    dtype TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+                """
+            )
+
+    def bump(self, dtype):
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                """
+                INSERT INTO data_version (dtype, version) VALUES (?, ?)
+                ON CONFLICT (dtype) DO UPDATE
+                SET version = MAX(excluded.version, version + 1)
+                """,
+                (dtype, time.time_ns()),
+            )
+
+    def get(self, dtypes):
+        with closing(connect(self.path)) as conn:
+            versions = self.select(conn, dtypes)
+
+            # Only the first read of a key takes the write lock
+            missing = [dtype for dtype in dtypes if dtype not in versions]
+            if missing:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO data_version (dtype, version) VALUES (?, ?)",
+                    [(dtype, time.time_ns()) for dtype in missing],
+                )
+                versions.update(self.select(conn, missing))
+
+        return [versions[dtype] for dtype in dtypes]
+
+    @staticmethod
+    def select(conn, dtypes):
+        return {
+            row["dtype"]: row["version"]
+            for row in conn.execute(
+                f"""
+                SELECT dtype, version FROM data_version
+                WHERE dtype IN ({", ".join("?" * len(dtypes))})
+                """,
+                list(dtypes),
+            )
+        }
+
+
+class SQLiteResponseCache:
+    """
+    `ResponseCache` shared by the worker processes of a host. Hits and misses
+    are counted per process.
+    """
+
+    def __init__(self, path=FANOUT_PATH, maxsize=256, ttl=300):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    used_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS response_cache_used_at ON response_cache (used_at)"
+            )
+
+    def get(self, key):
+        now = time.time()
+        with closing(connect(self.path)) as conn:
+            entry = conn.execute(
+                "SELECT headers, body FROM response_cache WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            conn.execute(
+                "UPDATE response_cache SET used_at = ? WHERE key = ?", (now, key)
+            )
+
+        self.hits += 1
+        return json.loads(entry["headers"]), entry["body"]
+
+    def put(self, key, headers, body):
+        now = time.time()
+        with transaction(self.path) as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO response_cache
+                (key, headers, body, expires_at, used_at) VALUES (?, ?, ?, ?, ?)
+                """,
+                (key, json.dumps(headers), body, now + self.ttl, now),
+            )
+            conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                """
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.maxsize,),
+            )
+
+    def stats(self):
+        with closing(connect(self.path)) as conn:
+            size = conn.execute(
+                "SELECT COUNT(*) FROM response_cache WHERE expires_at > ?",
+                (time.time(),),
+            ).fetchone()[0]
+
+        total = self.hits + self.misses
+        return {
+            "size": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
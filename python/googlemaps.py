@@ -1,13 +1,23 @@
 # -*- coding: utf-8 -*-
 import logging
+import os
+import threading
 import time
 import traceback
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional, Union
 
 import pandas as pd
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
 from selenium.webdriver import ChromeOptions as Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -18,13 +28,232 @@ GM_WEBPAGE = "https://www.google.com/maps/"
 MAX_WAIT = 10
 MAX_RETRY = 5
 MAX_SCROLLS = 40
+DRIVER_POOL_SIZE = int(os.environ.get("DRIVER_POOL_SIZE", 1))
+DRIVER_MAX_USES = 20
+DRIVER_IDLE_TIMEOUT = 10 * 60
+POLL_FREQUENCY = 0.2
+
+# TODO: Subject to changes
+REVIEW_SELECTOR = "div.jftiEf.fontBodyMedium"
+RESULTS_SELECTOR = (
+    "div.m6QErb.DxyBCb.kA9KIf.dS8AEf.ecceSd > div[aria-label*='Results for']"
+)
+PLACE_SELECTOR = "div[jsaction] > a[href]"
+EXPAND_SELECTOR = "button.w8nwRe.kyuRq"
+
+# Both snippets only touch the review nodes appended after `offset`, so each
+# page of reviews is expanded and extracted once.
+EXPAND_REVIEWS_JS = """
+const [selector, offset, expandSelector] = arguments;
+Array.from(document.querySelectorAll(selector))
+  .slice(offset)
+  .forEach((node) =>
+    node.querySelectorAll(expandSelector).forEach((button) => button.click())
+  );
+"""
+
+EXTRACT_REVIEWS_JS = """
+const [selector, offset] = arguments;
+const text = (node, sel) => {
+  const el = node.querySelector(sel);
+  return el ? el.textContent : null;
+};
+const attr = (node, sel, name) => {
+  const el = node.querySelector(sel);
+  return el ? el.getAttribute(name) : null;
+};
+return Array.from(document.querySelectorAll(selector))
+  .slice(offset)
+  .map((node) => ({
+    id_review: node.getAttribute("data-review-id"),
+    username: node.getAttribute("aria-label"),
+    caption: text(node, "span.wiI7pd"),
+    rating: attr(node, "span.kvMYJc", "aria-label"),
+    relative_date: text(node, "span.rsqaWe"),
+    n_reviews: text(node, "div.RfnDt"),
+    url_user: attr(node, "button.WEBjve", "data-href"),
+  }));
+"""
+
+
+def create_driver(debug=False):
+    options = Options()
+
+    if not debug:
+        options.add_argument("--headless")
+    else:
+        options.add_argument("--window-size=1366,768")
+
+    options.add_argument("--disable-notifications")
+    options.add_argument("--lang=en-GB")
+    options.add_argument("--accept-lang=en-GB")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+
+    input_driver = webdriver.Chrome(service=Service(), options=options)
+
+    # click on google agree button so we can continue (not needed anymore)
+    # EC.element_to_be_clickable((By.XPATH, '//span[contains(text(), "I agree")]')))
+    input_driver.get(GM_WEBPAGE)
+
+    return input_driver
+
+
+class PooledDriver:
+    __slots__ = ("driver", "uses", "last_used")
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.last_used = time.monotonic()
+
+
+class DriverPool:
+    """
+    Pool of warm Chrome drivers. Drivers are health-checked before being lent,
+    recycled after `max_uses` borrows and quit once idle for `idle_timeout`.
+    """
+
+    def __init__(
+        self,
+        size=DRIVER_POOL_SIZE,
+        max_uses=DRIVER_MAX_USES,
+        idle_timeout=DRIVER_IDLE_TIMEOUT,
+        debug=False,
+    ):
+        self.size = size
+        self.max_uses = max_uses
+        self.idle_timeout = idle_timeout
+        self.debug = debug
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        self.reap()
+
+        while True:
+            with self.lock:
+                pooled = self.idle.pop() if self.idle else None
+
+            if pooled is None:
+                return PooledDriver(create_driver(self.debug))
+
+            if self.__is_healthy(pooled.driver):
+                return pooled
+
+            self.__quit(pooled)
+
+    def release(self, pooled, broken=False):
+        pooled.uses += 1
+        pooled.last_used = time.monotonic()
+
+        with self.lock:
+            if (
+                not broken
+                and pooled.uses < self.max_uses
+                and len(self.idle) < self.size
+            ):
+                self.idle.append(pooled)
+                return
+
+        self.__quit(pooled)
+
+    def warm(self, count=None):
+        """Starts drivers until `count` (default: the pool size) are idle."""
+        count = self.size if count is None else count
+        while len(self.idle) < count:
+            pooled = PooledDriver(create_driver(self.debug))
+            with self.lock:
+                self.idle.append(pooled)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+
+        for pooled in idle:
+            self.__quit(pooled)
+
+    def reap(self):
+        """
+        Quits the drivers idle for longer than `idle_timeout`. Called on every
+        borrow, and periodically by owners that may stop borrowing.
+        """
+        now = time.monotonic()
+        with self.lock:
+            expired = [p for p in self.idle if now - p.last_used > self.idle_timeout]
+            self.idle = [p for p in self.idle if p not in expired]
+
+        for pooled in expired:
+            self.__quit(pooled)
+
+    @staticmethod
+    def __is_healthy(driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    @staticmethod
+    def __quit(pooled):
+        try:
+            pooled.driver.quit()
+        except WebDriverException:
+            pass
+
+
+driver_pool = DriverPool()
+
+
+@dataclass
+class Place:
+    __slots__ = ("search_point_url", "href", "name")
+
+    search_point_url: str
+    href: str
+    name: str
+
+
+@dataclass
+class ScrapedReview:
+    __slots__ = (
+        "id_review",
+        "caption",
+        "relative_date",
+        "retrieval_date",
+        "rating",
+        "username",
+        "n_review_user",
+        "url_user",
+    )
+
+    id_review: Optional[str]
+    caption: Optional[str]
+    relative_date: Optional[str]
+    retrieval_date: datetime
+    rating: Optional[float]
+    username: Optional[str]
+    n_review_user: Union[str, int]
+    url_user: Optional[str]
+
+
+def records_to_frame(records, record_type):
+    """Materializes slotted records into a DataFrame in a single pass."""
+    columns = list(record_type.__slots__)
+    return pd.DataFrame(
+        [tuple(getattr(record, column) for column in columns) for record in records],
+        columns=columns,
+    )
 
 
 class GoogleMapsScraper:
-    def __init__(self, debug=False):
+    def __init__(self, debug=False, pool=None):
         self.debug = debug
-        self.driver = self.__get_driver()
+        self.pool = pool or (DriverPool(size=0, debug=True) if debug else driver_pool)
+        self.pooled = self.pool.acquire()
+        self.driver = self.pooled.driver
         self.logger = self.__get_logger()
+        self.timings = defaultdict(float)
 
     def __enter__(self):
         return self
@@ -33,12 +262,54 @@ class GoogleMapsScraper:
         if exc_type is not None:
             traceback.print_exception(exc_type, exc_value, tb)
 
-        self.driver.close()
-        self.driver.quit()
+        self.logger.debug(
+            "Scrape timings: "
+            + ", ".join(
+                f"{step}={seconds:.2f}s" for step, seconds in self.timings.items()
+            )
+        )
+
+        self.pool.release(
+            self.pooled,
+            broken=exc_type is not None and issubclass(exc_type, WebDriverException),
+        )
 
         return True
 
+    @contextmanager
+    def timed(self, step):
+        """Adds the wall time spent in the block to `timings[step]`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[step] += time.perf_counter() - start
+
+    def wait_for(self, condition, timeout=MAX_WAIT):
+        """
+        Waits until `condition(driver)` is truthy, polling the DOM instead of
+        sleeping for a fixed time. Returns False on timeout.
+        """
+        try:
+            return WebDriverWait(
+                self.driver, timeout, poll_frequency=POLL_FREQUENCY
+            ).until(condition)
+        except TimeoutException:
+            return False
+
+    def review_count(self):
+        return len(self.driver.find_elements(By.CSS_SELECTOR, REVIEW_SELECTOR))
+
+    def __renew_driver(self):
+        self.pool.release(self.pooled, broken=True)
+        self.pooled = self.pool.acquire()
+        self.driver = self.pooled.driver
+
     def sort_by(self, url, ind):
+        with self.timed("sort_by"):
+            return self.__sort_by(url, ind)
+
+    def __sort_by(self, url, ind):
         self.driver.get(url)
         self.__click_on_cookie_agreement()
 
@@ -56,8 +327,15 @@ class GoogleMapsScraper:
                 )
                 menu_bt.click()
 
-                clicked = True
-                time.sleep(3)
+                clicked = bool(
+                    self.wait_for(
+                        EC.presence_of_all_elements_located(
+                            (By.XPATH, "//div[@role='menuitemradio']")
+                        )
+                    )
+                )
+                if not clicked:
+                    tries += 1
             except Exception as e:
                 tries += 1
                 self.logger.warn("Failed to click sorting button")
@@ -73,37 +351,31 @@ class GoogleMapsScraper:
         recent_rating_bt.click()
 
         # wait to load review (ajax call)
-        time.sleep(5)
+        self.wait_for(
+            EC.presence_of_element_located((By.CSS_SELECTOR, REVIEW_SELECTOR))
+        )
 
         return 0
 
-    def get_places(self, keyword_list=None, save=False):
-        df_places = pd.DataFrame()
+    def iter_places(self, keyword_list=None):
+        """Yields a `Place` for every place found at the search points."""
         search_point_url_list = self._gen_search_points_from_square(
             keyword_list=keyword_list
         )
 
         for i, search_point_url in enumerate(search_point_url_list):
             if (i + 1) % 10 == 0:
-                df_places = df_places[
-                    [
-                        "search_point_url",
-                        "href",
-                        "name",
-                        "rating",
-                        "num_reviews",
-                        "close_time",
-                        "other",
-                    ]
-                ]
-                if save:
-                    df_places.to_csv("output/places_wax.csv", index=False)
-
-                return df_places
+                return
 
             try:
-                self.driver.get(search_point_url)
-                time.sleep(5)
+                with self.timed("search"):
+                    self.driver.get(search_point_url)
+                    self.wait_for(
+                        lambda driver: (
+                            "place" in driver.current_url
+                            or driver.find_elements(By.CSS_SELECTOR, RESULTS_SELECTOR)
+                        )
+                    )
                 new_url = self.driver.current_url
                 if "place" in new_url:
                     try:
@@ -115,83 +387,79 @@ class GoogleMapsScraper:
                     except NoSuchElementException:
                         name = "Unknown"
 
-                    # Add data to dataframe
-                    place_info = {
-                        "search_point_url": search_point_url,
-                        "href": new_url,
-                        "name": name,
-                    }
-                    place_info_df = pd.DataFrame([place_info])
-                    df_places = pd.concat([df_places, place_info_df], ignore_index=True)
+                    yield Place(search_point_url, new_url, name)
                     continue
 
             except NoSuchElementException:
-                self.driver.quit()
-                self.driver = self.__get_driver()
+                self.__renew_driver()
                 self.driver.get(search_point_url)
 
             # scroll to load all (20) places into the page
-            scrollable_div = self.driver.find_element(
-                By.CSS_SELECTOR,
-                "div.m6QErb.DxyBCb.kA9KIf.dS8AEf.ecceSd > div[aria-label*='Results for']",
-            )
-            for i in range(10):
-                self.driver.execute_script(
-                    "arguments[0].scrollTop = arguments[0].scrollHeight", scrollable_div
+            with self.timed("places"):
+                scrollable_div = self.driver.find_element(
+                    By.CSS_SELECTOR, RESULTS_SELECTOR
                 )
+                for i in range(10):
+                    self.driver.execute_script(
+                        "arguments[0].scrollTop = arguments[0].scrollHeight",
+                        scrollable_div,
+                    )
 
-            # Get places names and href
-            time.sleep(2)
+                # Get places names and href
+                self.wait_for(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, PLACE_SELECTOR))
+                )
             response = BeautifulSoup(self.driver.page_source, "html.parser")
-            div_places = response.select("div[jsaction] > a[href]")
+            div_places = response.select(PLACE_SELECTOR)
 
             for div_place in div_places:
-                place_info = {
-                    "search_point_url": search_point_url.replace(
-                        "https://www.google.com/maps/search/", ""
-                    ),
-                    "href": div_place["href"],
-                    "name": div_place["aria-label"],
-                }
-
-                place_info_df = pd.DataFrame(
-                    [place_info]
-                )  # Create a DataFrame from the dict
-                df_places = pd.concat([df_places, place_info_df], ignore_index=True)
+                yield Place(
+                    search_point_url.replace("https://www.google.com/maps/search/", ""),
+                    div_place["href"],
+                    div_place["aria-label"],
+                )
 
             # TODO: implement click to handle > 20 places
 
-        df_places = df_places[["search_point_url", "href", "name"]]
+    def get_places(self, keyword_list=None, save=False):
+        df_places = records_to_frame(self.iter_places(keyword_list), Place)
 
         if save:
             df_places.to_csv("output/places_wax.csv", index=False)
 
         return df_places
 
-    def get_reviews(self, offset):
-        # scroll to load reviews
-        self.__scroll()
+    def iter_reviews(self):
+        """Yields a `ScrapedReview` per review, scrolling until none are left."""
+        offset = 0
+        while True:
+            reviews = self.get_reviews(offset)
+            if not reviews:
+                return
 
-        # wait for other reviews to load (ajax)
-        time.sleep(4)
+            yield from reviews
+            offset += len(reviews)
 
-        # expand review text
-        self.__expand_reviews()
+    def get_reviews(self, offset):
+        with self.timed("load_reviews"):
+            loaded = self.review_count()
 
-        # parse reviews
-        response = BeautifulSoup(self.driver.page_source, "html.parser")
-        # TODO: Subject to changes
-        rblock = response.find_all("div", class_="jftiEf fontBodyMedium")
-        parsed_reviews = []
-        for index, review in enumerate(rblock):
-            if index >= offset:
-                r = self.__parse(review)
-                parsed_reviews.append(r)
+            # scroll to load reviews
+            self.__scroll()
+
+            # wait for other reviews to load (ajax)
+            self.wait_for(lambda driver: self.review_count() > loaded)
 
-                # logging to std out
-                # print(r)
+        # expand review text
+        with self.timed("expand_reviews"):
+            self.__expand_reviews(offset)
 
-        return parsed_reviews
+        # parse only the reviews appended after offset
+        with self.timed("parse_reviews"):
+            reviews = self.driver.execute_script(
+                EXTRACT_REVIEWS_JS, REVIEW_SELECTOR, offset
+            )
+            return [self.__parse(review) for review in reviews or []]
 
     # need to use different url wrt reviews one to have all info
     def get_account(self, url):
@@ -199,7 +467,7 @@ class GoogleMapsScraper:
         self.__click_on_cookie_agreement()
 
         # ajax call also for this section
-        time.sleep(2)
+        self.wait_for(EC.presence_of_element_located((By.TAG_NAME, "h1")))
 
         resp = BeautifulSoup(self.driver.page_source, "html.parser")
 
@@ -208,69 +476,43 @@ class GoogleMapsScraper:
         return place_data
 
     def __parse(self, review):
-        item = {}
-
-        try:
-            # TODO: Subject to changes
-            id_review = review["data-review-id"]
-        except Exception as e:
-            id_review = None
+        # raw fields come from EXTRACT_REVIEWS_JS
+        id_review = review.get("id_review")
+        username = review.get("username")
 
         try:
-            # TODO: Subject to changes
-            username = review["aria-label"]
-        except Exception as e:
-            username = None
-
-        try:
-            # TODO: Subject to changes
-            review_text = self.__filter_string(
-                review.find("span", class_="wiI7pd").text
-            )
+            review_text = self.__filter_string(review["caption"])
         except Exception as e:
             review_text = None
 
         try:
-            # TODO: Subject to changes
-            rating = float(
-                review.find("span", class_="kvMYJc")["aria-label"].split(" ")[0]
-            )
+            rating = float(review["rating"].split(" ")[0])
         except Exception as e:
             rating = None
 
-        try:
-            # TODO: Subject to changes
-            relative_date = review.find("span", class_="rsqaWe").text
-        except Exception as e:
-            relative_date = None
+        relative_date = review.get("relative_date")
 
         try:
-            n_reviews = review.find("div", class_="RfnDt").text.split(" ")[3]
+            n_reviews = review["n_reviews"].split(" ")[3]
         except Exception as e:
             n_reviews = 0
 
-        try:
-            user_url = review.find("button", class_="WEBjve")["data-href"]
-        except Exception as e:
-            user_url = None
-
-        item["id_review"] = id_review
-        item["caption"] = review_text
+        user_url = review.get("url_user")
 
         # depends on language, which depends on geolocation defined by Google Maps
         # custom mapping to transform into date should be implemented
-        item["relative_date"] = relative_date
-
         # store datetime of scraping and apply further processing to calculate
         # correct date as retrieval_date - time(relative_date)
-        item["retrieval_date"] = datetime.now()
-        item["rating"] = rating
-        item["username"] = username
-        item["n_review_user"] = n_reviews
-        # item['n_photo_user'] = n_photos  ## not available anymore
-        item["url_user"] = user_url
-
-        return item
+        return ScrapedReview(
+            id_review=id_review,
+            caption=review_text,
+            relative_date=relative_date,
+            retrieval_date=datetime.now(),
+            rating=rating,
+            username=username,
+            n_review_user=n_reviews,
+            url_user=user_url,
+        )
 
     def __parse_place(self, response, url):
         place = {}
@@ -388,12 +630,11 @@ class GoogleMapsScraper:
         ]
 
     # expand review description
-    def __expand_reviews(self):
-        # use XPath to load complete reviews
-        # TODO: Subject to changes
-        buttons = self.driver.find_elements(By.CSS_SELECTOR, "button.w8nwRe.kyuRq")
-        for button in buttons:
-            self.driver.execute_script("arguments[0].click();", button)
+    def __expand_reviews(self, offset=0):
+        # click the "More" buttons of the new reviews to load complete text
+        self.driver.execute_script(
+            EXPAND_REVIEWS_JS, REVIEW_SELECTOR, offset, EXPAND_SELECTOR
+        )
 
     def __scroll(self):
         # TODO: Subject to changes
@@ -425,28 +666,6 @@ class GoogleMapsScraper:
 
         return logger
 
-    def __get_driver(self, debug=False):
-        options = Options()
-
-        if not self.debug:
-            options.add_argument("--headless")
-        else:
-            options.add_argument("--window-size=1366,768")
-
-        options.add_argument("--disable-notifications")
-        options.add_argument("--lang=en-GB")
-        options.add_argument("--accept-lang=en-GB")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-
-        input_driver = webdriver.Chrome(service=Service(), options=options)
-
-        # click on google agree button so we can continue (not needed anymore)
-        # EC.element_to_be_clickable((By.XPATH, '//span[contains(text(), "I agree")]')))
-        input_driver.get(GM_WEBPAGE)
-
-        return input_driver
-
     # cookies agreement click
     def __click_on_cookie_agreement(self):
         try:
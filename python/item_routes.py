@@ -1,36 +1,55 @@
 from datetime import datetime
 
-from database import Category, Item, Position, db
-from flask import Blueprint, g, jsonify, request
+from database import Category, Item, Position, db, keyset_page
+from flask import Blueprint, g, json, jsonify, request
 from flask import current_app as app
+from flask_pydantic import validate
+from sqlalchemy.orm import selectinload
 from utils import (
     check_token,
     emit_data_change,
     remove_photo,
     require_fields,
     upload_photo,
+    versioned,
 )
 
-from python.response import DataResponse, ResourceNotFoundException
+from python.response import DataResponse, ResourceNotFoundException, page_headers
+from python.schema import DataPageQuery
 
 item_routes = Blueprint("item_routes", __name__)
 
 
 @item_routes.route("/get_item_data", methods=["GET"])
 @check_token(Position.executive)
-def get_item_data():
+@versioned("item")
+@validate()
+def get_item_data(query: DataPageQuery):
     app.logger.debug(f"{g.user['email']} | request item data")
 
-    categories = Category.query.all()
-    items = Item.query.all()
+    items = Item.query.options(selectinload(Item.category))
+
+    if query.category is not None:
+        items = items.filter(Item.category_id == query.category)
+    if query.date_from:
+        items = items.filter(Item.last_update >= query.date_from)
+    if query.date_to:
+        items = items.filter(Item.last_update <= query.date_to)
+
+    items, next_cursor = keyset_page(
+        items, Item.id, query.cursor, query.limit, query.order == "desc"
+    )
+
+    data = {"data": [item.as_dict() for item in items]}
+    # Later pages reuse the categories sent with the first one
+    if query.cursor is None:
+        data["categories"] = [category.as_dict() for category in Category.query.all()]
 
-    data = [item.as_dict() for item in items]
     app.logger.debug(f"{g.user['email']} | Returning item data")
     return DataResponse(
-        data={
-            "data": data,
-            "categories": [category.as_dict() for category in categories],
-        }
+        data=data,
+        headers=page_headers(next_cursor),
+        etag=g.etag,
     ).to_response()
 
 
@@ -93,10 +112,10 @@ def delete_item(item_id):
     if item.photo:
         remove_photo(item.photo)
 
+    data = json.dumps(item.as_dict())
     db.session.delete(item)
-    db.session.flush()
-    emit_data_change(g.user["uid"], "delete", item)
     db.session.commit()
+    emit_data_change(g.user["uid"], "delete", None, item.__tablename__, data)
 
     app.logger.debug(f"{g.user['email']} | performed delete item data")
 
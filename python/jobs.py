@@ -0,0 +1,280 @@
+import enum
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing, contextmanager
+
+import gevent
+
+JOB_QUEUE_PATH = os.environ.get(
+    "JOB_QUEUE_PATH", os.path.join(os.getcwd(), "jobs.sqlite3")
+)
+JOB_POLL_INTERVAL = 1
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 30
+JOB_RETENTION = 7 * 24 * 60 * 60
+
+
+class JobStatus(enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class JobQueue:
+    """
+    Local, SQLite-backed job queue shared by the web workers and the job worker
+    processes. At most one pending job exists per (kind, key); enqueueing again
+    only refreshes its payload.
+    """
+
+    def __init__(self, path=JOB_QUEUE_PATH):
+        self.path = path
+        self.initialized = False
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+
+        if not self.initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    reported_status TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    available_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE UNIQUE INDEX IF NOT EXISTS job_pending_key
+                ON job (kind, key) WHERE status = 'pending'
+                """
+            )
+            self.initialized = True
+
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, kind, key, payload):
+        self.enqueue_many(kind, [(key, payload)])
+
+    def enqueue_many(self, kind, jobs):
+        """Enqueues an iterable of (key, payload) pairs in one transaction."""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.executemany(
+                """
+                INSERT INTO job (kind, key, payload, status, available_at, updated_at)
+                VALUES (?, ?, ?, 'pending', ?, ?)
+                ON CONFLICT (kind, key) WHERE status = 'pending'
+                DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at
+                """,
+                (
+                    (kind, str(key), json.dumps(payload), now, now)
+                    for key, payload in jobs
+                ),
+            )
+
+    def claim(self, kinds=None):
+        """Atomically marks the oldest available pending job as running."""
+        jobs = self.claim_many(kinds, 1)
+        return jobs[0] if jobs else None
+
+    def claim_many(self, kinds=None, limit=1):
+        """
+        Atomically marks up to `limit` of the oldest available pending jobs as
+        running, optionally restricted to the given job kinds. A job is not
+        claimed while another job for the same (kind, key) is still running.
+        """
+        now = time.time()
+        query = """
+            SELECT * FROM job WHERE status = 'pending' AND available_at <= ?
+            AND NOT EXISTS (
+                SELECT 1 FROM job r
+                WHERE r.kind = job.kind AND r.key = job.key AND r.status = 'running'
+            )
+        """
+        params = [now]
+        if kinds is not None:
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        with self.transaction() as conn:
+            jobs = conn.execute(f"{query} ORDER BY id LIMIT ?", (*params, limit))
+            jobs = jobs.fetchall()
+
+            conn.executemany(
+                """
+                UPDATE job SET status = 'running', attempts = attempts + 1,
+                updated_at = ? WHERE id = ?
+                """,
+                [(now, job["id"]) for job in jobs],
+            )
+
+        return [dict(job, payload=json.loads(job["payload"])) for job in jobs]
+
+    def complete(self, job_id):
+        with closing(self.connect()) as conn:
+            conn.execute(
+                "UPDATE job SET status = 'done', error = NULL, updated_at = ? WHERE id = ?",
+                (time.time(), job_id),
+            )
+
+    def fail(self, job_id, error):
+        """
+        Schedules a retry with linear backoff, or gives up after `MAX_ATTEMPTS`
+        or when a newer pending job for the same key supersedes this one.
+        """
+        now = time.time()
+        with self.transaction() as conn:
+            job = conn.execute("SELECT * FROM job WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return
+
+            retry = job["attempts"] < MAX_ATTEMPTS and not self.has_pending(
+                conn, job["kind"], job["key"]
+            )
+            conn.execute(
+                """
+                UPDATE job SET status = ?, available_at = ?, error = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (
+                    JobStatus.PENDING.value if retry else JobStatus.FAILED.value,
+                    now + RETRY_DELAY * job["attempts"],
+                    str(error),
+                    now,
+                    job_id,
+                ),
+            )
+
+    def requeue_running(self, kinds=None, stale_after=0):
+        """
+        Returns jobs left running by a crashed worker to the queue, optionally
+        only those of the given kinds that have been running for `stale_after`
+        seconds.
+        """
+        query = "SELECT * FROM job WHERE status = 'running' AND updated_at <= ?"
+        params = [time.time() - stale_after]
+        if kinds is not None:
+            query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+            params.extend(kinds)
+
+        with self.transaction() as conn:
+            jobs = conn.execute(query, params).fetchall()
+            for job in jobs:
+                if self.has_pending(conn, job["kind"], job["key"]):
+                    status, error = JobStatus.FAILED.value, "Superseded"
+                else:
+                    status, error = JobStatus.PENDING.value, job["error"]
+
+                conn.execute(
+                    "UPDATE job SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                    (status, error, time.time(), job["id"]),
+                )
+
+    @staticmethod
+    def has_pending(conn, kind, key):
+        return (
+            conn.execute(
+                "SELECT 1 FROM job WHERE kind = ? AND key = ? AND status = 'pending'",
+                (kind, key),
+            ).fetchone()
+            is not None
+        )
+
+    def take_unreported(self):
+        """
+        Returns the jobs whose status changed since they were last reported,
+        marking them as reported so that only one web worker reports each change.
+        """
+        with closing(self.connect()) as conn:
+            jobs = conn.execute(
+                """
+                SELECT * FROM job
+                WHERE reported_status IS NULL OR reported_status != status
+                ORDER BY updated_at
+                """
+            ).fetchall()
+
+            taken = []
+            for job in jobs:
+                claimed = conn.execute(
+                    """
+                    UPDATE job SET reported_status = ?
+                    WHERE id = ? AND status = ?
+                    AND (reported_status IS NULL OR reported_status != status)
+                    """,
+                    (job["status"], job["id"], job["status"]),
+                ).rowcount
+                if claimed:
+                    taken.append(dict(job, payload=json.loads(job["payload"])))
+
+        return taken
+
+    def purge(self):
+        """Deletes reported, finished jobs older than `JOB_RETENTION`."""
+        with closing(self.connect()) as conn:
+            conn.execute(
+                """
+                DELETE FROM job
+                WHERE status IN ('done', 'failed') AND reported_status = status
+                AND updated_at < ?
+                """,
+                (time.time() - JOB_RETENTION,),
+            )
+
+
+job_queue = JobQueue()
+
+
+def init_job_reporter(app, reporters):
+    """
+    Spawns a greenlet that forwards job status changes to the reporter
+    registered for the job's kind, each reporter receiving its jobs as a list.
+    """
+
+    def poll():
+        while True:
+            try:
+                with app.app_context():
+                    jobs = {}
+                    for job in job_queue.take_unreported():
+                        jobs.setdefault(job["kind"], []).append(job)
+
+                    for kind, kind_jobs in jobs.items():
+                        report = reporters.get(kind)
+                        if report:
+                            report(kind_jobs)
+                job_queue.purge()
+            except Exception as e:
+                app.logger.exception(f"Error reporting job status: {e}")
+
+            gevent.sleep(JOB_POLL_INTERVAL)
+
+    gevent.spawn(poll)
+    app.logger.info("Job reporter successfully initialized")
@@ -0,0 +1,189 @@
+from datetime import datetime, timedelta
+
+import gevent
+from database import MailStatus, OutboxMail, db
+from flask_mail import Message
+from jobs import JOB_RETENTION, MAX_ATTEMPTS, RETRY_DELAY
+from sqlalchemy import delete, select, update
+from utils import mail
+
+MAIL_BATCH_SIZE = 50
+MAIL_POLL_INTERVAL = 2
+MAIL_SEND_TIMEOUT = 5 * 60
+
+
+def enqueue_mail(kind, key, subject, recipients, html):
+    """
+    Adds an email to the outbox in the current session. It is queued by the
+    same commit as the rows it is about, and its delivery is reported to the
+    reporter registered for `kind` under `key`.
+    """
+    enqueue_mails(kind, [(key, subject, recipients, html)])
+
+
+def enqueue_mails(kind, mails):
+    """
+    Adds an iterable of (key, subject, recipients, html) emails to the outbox
+    in the current session, consuming it lazily.
+    """
+    now = datetime.now()
+    db.session.add_all(
+        OutboxMail(
+            kind=kind,
+            key=str(key),
+            subject=subject,
+            recipients=recipients,
+            html=html,
+            status=MailStatus.QUEUED,
+            available_at=now,
+            updated_at=now,
+        )
+        for key, subject, recipients, html in mails
+    )
+
+
+def claim(kinds):
+    """
+    Marks up to `MAIL_BATCH_SIZE` of the oldest available queued emails of the
+    given kinds as sending. Each email is claimed by a single dispatcher, even
+    when several worker processes poll the outbox.
+    """
+    now = datetime.now()
+    ids = db.session.scalars(
+        select(OutboxMail.id)
+        .where(
+            OutboxMail.status == MailStatus.QUEUED,
+            OutboxMail.available_at <= now,
+            OutboxMail.kind.in_(kinds),
+        )
+        .order_by(OutboxMail.id)
+        .limit(MAIL_BATCH_SIZE)
+    ).all()
+
+    claimed = [
+        id
+        for id in ids
+        if db.session.execute(
+            update(OutboxMail)
+            .where(OutboxMail.id == id, OutboxMail.status == MailStatus.QUEUED)
+            .values(
+                status=MailStatus.SENDING,
+                attempts=OutboxMail.attempts + 1,
+                updated_at=now,
+            )
+        ).rowcount
+    ]
+    db.session.commit()
+
+    if not claimed:
+        return []
+    return OutboxMail.query.filter(OutboxMail.id.in_(claimed)).all()
+
+
+def fail(outbox_mail, error):
+    """Schedules a retry with linear backoff, or gives up after `MAX_ATTEMPTS`."""
+    now = datetime.now()
+    if outbox_mail.attempts < MAX_ATTEMPTS:
+        outbox_mail.status = MailStatus.QUEUED
+        outbox_mail.available_at = now + timedelta(
+            seconds=RETRY_DELAY * outbox_mail.attempts
+        )
+    else:
+        outbox_mail.status = MailStatus.FAILED
+    outbox_mail.error = str(error)[:1024]
+    outbox_mail.updated_at = now
+
+
+def report(reporters, mails):
+    for outbox_mail in mails:
+        reporters[outbox_mail.kind](outbox_mail.key, outbox_mail.status)
+
+
+def send_batch(app, reporters):
+    """
+    Sends a batch of queued emails over a single SMTP connection and reports
+    their delivery status. Returns the number of emails taken from the outbox.
+    """
+    with app.app_context():
+        mails = claim(list(reporters))
+        if not mails:
+            return 0
+
+        report(reporters, mails)
+
+        pending = list(mails)
+        try:
+            with mail.connect() as connection:
+                while pending:
+                    outbox_mail = pending.pop(0)
+                    try:
+                        connection.send(
+                            Message(
+                                subject=outbox_mail.subject,
+                                recipients=outbox_mail.recipients,
+                                html=outbox_mail.html,
+                            )
+                        )
+                    except Exception as e:
+                        app.logger.exception(
+                            f"Failed to send mail {outbox_mail.key}: {e}"
+                        )
+                        fail(outbox_mail, e)
+                    else:
+                        outbox_mail.status = MailStatus.SENT
+                        outbox_mail.error = None
+                        outbox_mail.updated_at = datetime.now()
+        except Exception as e:
+            app.logger.exception(f"Failed to connect to the mail server: {e}")
+            for outbox_mail in pending:
+                fail(outbox_mail, e)
+
+        db.session.commit()
+        report(reporters, mails)
+
+        return len(mails)
+
+
+def recover(app):
+    """
+    Queues again the emails whose sender died mid-batch, and deletes finished
+    emails older than `JOB_RETENTION`.
+    """
+    now = datetime.now()
+    with app.app_context():
+        db.session.execute(
+            update(OutboxMail)
+            .where(
+                OutboxMail.status == MailStatus.SENDING,
+                OutboxMail.updated_at <= now - timedelta(seconds=MAIL_SEND_TIMEOUT),
+            )
+            .values(status=MailStatus.QUEUED, updated_at=now)
+        )
+        db.session.execute(
+            delete(OutboxMail).where(
+                OutboxMail.status.in_([MailStatus.SENT, MailStatus.FAILED]),
+                OutboxMail.updated_at <= now - timedelta(seconds=JOB_RETENTION),
+            )
+        )
+        db.session.commit()
+
+
+def init_mail_dispatcher(app, reporters):
+    """
+    Spawns a greenlet that drains the mail outbox, reporting the delivery of
+    each email to the reporter registered for its kind.
+    """
+
+    def dispatch():
+        while True:
+            try:
+                recover(app)
+                if send_batch(app, reporters) == MAIL_BATCH_SIZE:
+                    continue
+            except Exception as e:
+                app.logger.exception(f"Error dispatching mail: {e}")
+
+            gevent.sleep(MAIL_POLL_INTERVAL)
+
+    gevent.spawn(dispatch)
+    app.logger.info("Mail dispatcher successfully initialized")
@@ -1,14 +1,153 @@
-from database import Category, Position, Procurement, ProcurementItem, Vendor, db
-from flask import Blueprint, g, jsonify
+import csv
+import io
+from itertools import islice
+
+from database import (
+    RFQ,
+    Category,
+    Item,
+    Position,
+    Procurement,
+    ProcurementItem,
+    VendorSuggestion,
+    db,
+    gen,
+    iter_keyset,
+    keyset_page,
+)
+from flask import Blueprint, g, jsonify, request
 from flask import current_app as app
-from sqlalchemy.orm import joinedload
+from flask_pydantic import validate
+from pydantic import ValidationError
+from sqlalchemy import case, func, insert
 from utils import (
     check_token,
+    data_versions,
     require_fields,
+    versioned,
+)
+
+from python.response import (
+    DataResponse,
+    ExceptionResponse,
+    Response,
+    StreamDataResponse,
+    page_headers,
 )
+from python.schema import DataPageQuery, ProcurementLine, SuggestionQuery
 
 procurement_routes = Blueprint("procurement_routes", __name__)
 
+PROCUREMENT_BATCH_SIZE = 500
+
+
+def procurement_summary_query():
+    """
+    Returns a projected procurement query with RFQ counts aggregated in SQL.
+    """
+    rfq_counts = (
+        db.session.query(
+            RFQ.procurement_id.label("procurement_id"),
+            func.count(RFQ.id).label("rfq_total"),
+            func.sum(case((RFQ.response_time.isnot(None), 1), else_=0)).label(
+                "rfq_complete"
+            ),
+        )
+        .group_by(RFQ.procurement_id)
+        .subquery()
+    )
+
+    return db.session.query(
+        Procurement.id,
+        Procurement.date,
+        func.coalesce(rfq_counts.c.rfq_total, 0).label("rfq_total"),
+        func.coalesce(rfq_counts.c.rfq_complete, 0).label("rfq_complete"),
+    ).outerjoin(rfq_counts, rfq_counts.c.procurement_id == Procurement.id)
+
+
+def iter_procurement_data(procurements, batch_size=PROCUREMENT_BATCH_SIZE):
+    """
+    Yields `Procurement.as_dict`-shaped rows for the given summary rows without
+    loading ORM objects. The item lines of each batch of procurements are
+    fetched in one projected query.
+    """
+    procurements = iter(procurements)
+    while True:
+        batch = list(islice(procurements, batch_size))
+        if not batch:
+            return
+
+        items = {procurement.id: [] for procurement in batch}
+        lines = (
+            db.session.query(
+                ProcurementItem.procurement_id,
+                ProcurementItem.item_id,
+                ProcurementItem.quantity,
+                ProcurementItem.unit_price,
+                Item.name,
+                Category.name.label("category"),
+                Category.id.label("category_id"),
+            )
+            .join(Item, ProcurementItem.item_id == Item.id)
+            .join(Category, Item.category_id == Category.id)
+            .filter(ProcurementItem.procurement_id.in_(items.keys()))
+            .all()
+        )
+        for line in lines:
+            items[line.procurement_id].append(line._asdict())
+
+        for procurement in batch:
+            yield {
+                "id": procurement.id,
+                "date": procurement.date,
+                "items": items[procurement.id],
+                "rfq_total": int(procurement.rfq_total),
+                "rfq_complete": int(procurement.rfq_complete),
+            }
+
+
+def parse_procurement_lines(rows, parse=ProcurementLine.model_validate):
+    """Lazily validates procurement lines, reporting the first invalid one."""
+    for number, row in enumerate(rows, 1):
+        try:
+            yield parse(row)
+        except ValidationError as e:
+            raise ExceptionResponse(
+                code="data/validation-error",
+                user_message=f"Line {number} of the procurement is invalid.",
+                server_message=f"Invalid procurement line {number}: {e}",
+                status_code=400,
+            )
+
+
+def insert_procurement(lines, batch_size=PROCUREMENT_BATCH_SIZE):
+    """
+    Inserts a procurement and its lines in the current transaction, with one
+    multi-row insert per batch of lines instead of an ORM object per line.
+    Returns the procurement id and the number of lines inserted.
+    """
+    procurement_id = next(gen)
+    db.session.execute(insert(Procurement).values(id=procurement_id))
+
+    count = 0
+    lines = iter(lines)
+    while batch := list(islice(lines, batch_size)):
+        db.session.execute(
+            insert(ProcurementItem),
+            [
+                {
+                    "procurement_id": procurement_id,
+                    "item_id": line.id,
+                    "quantity": line.quantity,
+                    "unit_price": line.price,
+                }
+                for line in batch
+            ],
+        )
+        count += len(batch)
+
+    return procurement_id, count
+
 
 @procurement_routes.route("/add_procurement", methods=["POST"])
 @check_token(Position.executive)
@@ -24,56 +163,121 @@ def add_procurement(data):
     else:
         rows = [data]
 
-    procurement = Procurement()
-    db.session.add(procurement)
-    db.session.commit()
+    try:
+        insert_procurement(parse_procurement_lines(rows))
+        db.session.commit()
+    except ExceptionResponse:
+        db.session.rollback()
+        raise
 
-    for row in rows:
-        item = ProcurementItem(
-            procurement_id=procurement.id,
-            item_id=row["id"],
-            quantity=row["quantity"],
-            unit_price=row["price"],
-        )
-        db.session.add(item)
-
-    db.session.commit()
+    data_versions.bump("procurement")
 
     return jsonify(
         {"message": "Procurement data saved successfully.", "rows": rows}
     ), 201
 
 
+@procurement_routes.route("/upload_procurement", methods=["POST"])
+@check_token(Position.executive)
+def upload_procurement():
+    """
+    Creates a procurement from a streamed CSV (`text/csv`, with `id`,
+    `quantity` and `price` columns) or JSON Lines (`application/x-ndjson`)
+    upload, without buffering the whole body.
+    """
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+
+    if request.mimetype == "text/csv":
+        lines = parse_procurement_lines(csv.DictReader(stream))
+    elif request.mimetype == "application/x-ndjson":
+        lines = parse_procurement_lines(
+            (line for line in stream if line.strip()),
+            ProcurementLine.model_validate_json,
+        )
+    else:
+        return Response(
+            code="data/unsupported-type",
+            message="Upload the procurement lines as CSV or JSON Lines.",
+            status_code=415,
+        ).to_response()
+
+    try:
+        procurement_id, count = insert_procurement(lines)
+        db.session.commit()
+    except ExceptionResponse:
+        db.session.rollback()
+        raise
+
+    data_versions.bump("procurement")
+
+    app.logger.debug(f"{g.user['email']} | uploaded procurement with {count} lines")
+    return Response(
+        code="crud/add",
+        message="Procurement data saved successfully.",
+        status_code=201,
+        id=procurement_id,
+        rows=count,
+    ).to_response()
+
+
 @procurement_routes.route("/get_procurement_data", methods=["GET"])
 @check_token(Position.executive)
-def get_procurement_data():
+@versioned("procurement", "rfq", "item")
+@validate()
+def get_procurement_data(query: DataPageQuery):
     app.logger.debug(f"{g.user['email']} | request procurement data")
 
-    procurements = Procurement.query.all()
+    procurements = procurement_summary_query()
+
+    if query.date_from:
+        procurements = procurements.filter(Procurement.date >= query.date_from)
+    if query.date_to:
+        procurements = procurements.filter(Procurement.date <= query.date_to)
+
+    descending = query.order == "desc"
+    next_cursor = None
 
-    data = [procurement.as_dict() for procurement in procurements]
+    if query.limit is None:
+        procurements = iter_keyset(
+            procurements,
+            Procurement.id,
+            PROCUREMENT_BATCH_SIZE,
+            descending,
+            query.cursor,
+        )
+    else:
+        procurements, next_cursor = keyset_page(
+            procurements, Procurement.id, query.cursor, query.limit, descending
+        )
 
-    app.logger.debug(f"{g.user['email']} | Returning procurement data")
-    return jsonify({"data": data})
+    app.logger.debug(f"{g.user['email']} | Streaming procurement data")
+    return StreamDataResponse(
+        iter_procurement_data(procurements),
+        headers=page_headers(next_cursor),
+        etag=g.etag,
+    ).to_response()
 
 
 @procurement_routes.route("/get_suggestion_vendors/<category_id>", methods=["GET"])
 @check_token(Position.executive)
-def get_suggestion_vendors(category_id):
+@versioned("vendor", "rfq")
+@validate()
+def get_suggestion_vendors(category_id, query: SuggestionQuery):
     app.logger.debug(
         f"{g.user['email']} | request suggested vendor data of category {category_id}"
     )
 
-    vendors = (
-        db.session.query(Vendor)
-        .filter(Vendor.gred > 0)
-        .join(Vendor.categories)
-        .filter(Category.id == category_id)
-        .options(joinedload(Vendor.categories))
-        .all()
-    )
-
-    data = [vendor.as_dict() for vendor in vendors]
+    data = [
+        {
+            "id": suggestion.vendor_id,
+            "name": suggestion.name,
+            "gred": suggestion.gred,
+            "approved": suggestion.approved,
+            "rfq_total": suggestion.rfq_total,
+            "rfq_responded": suggestion.rfq_responded,
+        }
+        for suggestion in VendorSuggestion.ranked(category_id, query.limit)
+    ]
 
     app.logger.debug(f"{g.user['email']} | Returning suggested vendor data")
-    return jsonify({"data": data})
+    return DataResponse(data={"data": data}, etag=g.etag).to_response()
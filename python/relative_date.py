@@ -0,0 +1,113 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+
+import dateparser
+from dateutil.relativedelta import relativedelta
+
+# Fixed bases used to turn dateparser fallbacks into base-independent offsets;
+# only expressions that move with the base are relative
+FALLBACK_BASE = datetime(2000, 1, 1)
+FALLBACK_SHIFTED_BASE = datetime(2000, 1, 2)
+
+AMOUNTS = {"a": 1, "an": 1, "one": 1}
+
+RELATIVE_DATE_PATTERNS = [
+    (
+        re.compile(
+            r"^(?:edited )?(a|an|one|\d+) (second|minute|hour|day|week|month|year)s? ago$"
+        ),
+        lambda match: relativedelta(
+            **{
+                f"{match[2]}s": AMOUNTS.get(match[1]) or int(match[1]),
+            }
+        ),
+    ),
+    (re.compile(r"^(?:just now|today)$"), lambda match: relativedelta()),
+    (re.compile(r"^yesterday$"), lambda match: relativedelta(days=1)),
+]
+
+
+def normalize(relative_date):
+    return " ".join(relative_date.lower().split())
+
+
+@lru_cache(maxsize=1024)
+def relative_offset(relative_date):
+    """
+    Returns how far back a normalized relative date points, or None if it
+    cannot be parsed. Falls back to dateparser for unknown phrasings.
+    """
+    for pattern, offset in RELATIVE_DATE_PATTERNS:
+        match = pattern.match(relative_date)
+        if match:
+            return offset(match)
+
+    parsed = dateparser.parse(relative_date, settings={"RELATIVE_BASE": FALLBACK_BASE})
+    if parsed is None:
+        return None
+
+    shifted = dateparser.parse(
+        relative_date, settings={"RELATIVE_BASE": FALLBACK_SHIFTED_BASE}
+    )
+    if shifted - parsed != FALLBACK_SHIFTED_BASE - FALLBACK_BASE:
+        return None
+    return relativedelta(FALLBACK_BASE, parsed)
+
+
+def resolve_relative_date(relative_date, base):
+    """
+    Resolves a relative date such as "3 months ago" against `base`. Absolute
+    dates are parsed as-is, uncached; dates later than `base` are rejected.
+    """
+    if not relative_date:
+        return None
+
+    offset = relative_offset(normalize(relative_date))
+    if offset is not None:
+        resolved = base - offset
+    else:
+        resolved = dateparser.parse(
+            relative_date,
+            settings={"RELATIVE_BASE": base, "PREFER_DATES_FROM": "past"},
+        )
+
+    if resolved is None or resolved > base:
+        return None
+    return resolved
+
+
+if __name__ == "__main__":
+    import random
+    import time
+
+    vocabulary = [
+        "a minute ago",
+        "an hour ago",
+        "5 hours ago",
+        "a day ago",
+        "3 days ago",
+        "a week ago",
+        "2 weeks ago",
+        "a month ago",
+        "4 months ago",
+        "a year ago",
+        "2 years ago",
+        "Edited 3 weeks ago",
+    ]
+    samples = random.choices(vocabulary, k=10_000)
+    base = datetime.now()
+
+    start = time.perf_counter()
+    for sample in samples:
+        dateparser.parse(sample, settings={"RELATIVE_BASE": base})
+    dateparser_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for sample in samples:
+        resolve_relative_date(sample, base)
+    resolver_time = time.perf_counter() - start
+
+    print(f"dateparser.parse:      {dateparser_time:.3f}s")
+    print(f"resolve_relative_date: {resolver_time:.3f}s")
+    print(f"speedup:               {dateparser_time / resolver_time:.0f}x")
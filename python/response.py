@@ -1,21 +1,100 @@
-from flask import jsonify
+from flask import Response as FlaskResponse
+from flask import current_app, jsonify, request, stream_with_context
+
+
+def etag_headers(etag):
+    """
+    Returns the headers tagging a response with a weak ETag that clients must
+    revalidate before reuse.
+    """
+    return {"ETag": f'W/"{etag}"', "Cache-Control": "private, no-cache"}
+
+
+def is_not_modified(etag):
+    """
+    Returns whether the request's `If-None-Match` header matches the ETag.
+    """
+    return etag is not None and request.if_none_match.contains_weak(etag)
 
 
 class DataResponse:
-    def __init__(self, data, status_code=200):
+    def __init__(self, data, status_code=200, headers=None, etag=None):
         """
         Data response class.
         :param data: The data to be returned in the response.
         :param status_code: The HTTP status code for the response (default is 200).
+        :param headers: Additional headers to include in the response.
+        :param etag: The version tag of the data, answered with 304 on a match.
         """
         self.data = data
         self.status_code = status_code
+        self.headers = headers or {}
+        self.etag = etag
 
     def to_response(self):
         """
-        Converts the response into a Flask JSON response.
+        Converts the response into a Flask JSON response, or an empty 304
+        response if the client already holds this version of the data.
+        """
+        if self.etag is None:
+            return jsonify(self.data), self.status_code, self.headers
+
+        headers = {**self.headers, **etag_headers(self.etag)}
+        if is_not_modified(self.etag):
+            return "", 304, headers
+        return jsonify(self.data), self.status_code, headers
+
+
+class StreamDataResponse:
+    def __init__(self, rows, key="data", status_code=200, headers=None, etag=None):
         """
-        return jsonify(self.data), self.status_code
+        Streamed data response class.
+        :param rows: An iterable of JSON-serializable rows, consumed lazily.
+        :param key: The key the rows are wrapped under in the response object.
+        :param status_code: The HTTP status code for the response (default is 200).
+        :param headers: Additional headers to include in the response.
+        :param etag: The version tag of the data, answered with 304 on a match.
+        """
+        self.rows = rows
+        self.key = key
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.etag = etag
+
+    def generate(self):
+        """
+        Yields the response body chunk by chunk, one row at a time.
+        """
+        dumps = current_app.json.dumps
+        yield "{" + dumps(self.key) + ": ["
+        for index, row in enumerate(self.rows):
+            yield ("," if index else "") + dumps(row)
+        yield "]}"
+
+    def to_response(self):
+        """
+        Converts the response into a chunked Flask JSON response. The rows are
+        never consumed if the client already holds this version of the data.
+        """
+        headers = {"X-Accel-Buffering": "no", **self.headers}
+        if self.etag is not None:
+            headers.update(etag_headers(self.etag))
+            if is_not_modified(self.etag):
+                return FlaskResponse(status=304, headers=headers)
+
+        return FlaskResponse(
+            stream_with_context(self.generate()),
+            status=self.status_code,
+            content_type="application/json",
+            headers=headers,
+        )
+
+
+def page_headers(next_cursor):
+    """
+    Returns the headers advertising the cursor of the next page, if any.
+    """
+    return {"X-Next-Cursor": next_cursor} if next_cursor else {}
 
 
 class Response:
@@ -1,36 +1,76 @@
 from datetime import datetime, timedelta
 
 import jwt
-from database import RFQ, Position, ProcurementItem, RFQStatus, Vendor, db, gen
-from flask import Blueprint, g, jsonify, render_template, url_for
+from bulk_render import render_many, url_builder
+from database import (
+    RFQ,
+    MailStatus,
+    Position,
+    ProcurementItem,
+    RFQStatus,
+    Vendor,
+    db,
+    gen,
+    keyset_page,
+    refresh_vendor_suggestions,
+)
+from flask import Blueprint, g, jsonify, render_template
 from flask import current_app as app
-from flask_mail import Message
 from flask_pydantic import validate
-from utils import check_token, emit_data_change, mail
-
-from python.response import DataResponse, Response
-from python.schema import AddRFQRequest, PurchaseRequest, RFQEmailParams, RFQSubmission
+from mail_outbox import enqueue_mails
+from utils import check_token, data_versions, emit_data_change, versioned
+
+from python.response import DataResponse, Response, page_headers
+from python.schema import (
+    AddRFQRequest,
+    DataPageQuery,
+    PurchaseRequest,
+    RFQEmailParams,
+    RFQSubmission,
+)
 
 rfq_routes = Blueprint("rfq_routes", __name__)
 
+RFQ_MAIL_JOB = "rfq_mail"
+
+
+def report_rfq_mail(rfq_id, status):
+    rfq = db.session.get(RFQ, rfq_id)
+    if not rfq or rfq.mail_status == status:
+        return
+
+    rfq.mail_status = status
+    db.session.commit()
+    emit_data_change("cast", "modify", rfq)
+
 
 @rfq_routes.route("/get_rfq_data", methods=["GET"])
 @check_token(Position.executive)
-def get_rfq_data():
+@versioned("rfq", "vendor")
+@validate()
+def get_rfq_data(query: DataPageQuery):
     app.logger.debug(f"{g.user['email']} | Requesting RFQ data")
 
-    rfqs = (
-        db.session.query(
-            RFQ.id,
-            RFQ.date,
-            RFQ.token,
-            RFQ.response_time,
-            RFQ.procurement_id,
-            RFQ.status,
-            Vendor.name.label("vendor_name"),
-        )
-        .join(Vendor, RFQ.vendor_id == Vendor.id)
-        .all()
+    rfqs = db.session.query(
+        RFQ.id,
+        RFQ.date,
+        RFQ.token,
+        RFQ.response_time,
+        RFQ.procurement_id,
+        RFQ.status,
+        RFQ.mail_status,
+        Vendor.name.label("vendor_name"),
+    ).join(Vendor, RFQ.vendor_id == Vendor.id)
+
+    if query.status:
+        rfqs = rfqs.filter(RFQ.status == RFQStatus(query.status))
+    if query.date_from:
+        rfqs = rfqs.filter(RFQ.date >= query.date_from)
+    if query.date_to:
+        rfqs = rfqs.filter(RFQ.date <= query.date_to)
+
+    rfqs, next_cursor = keyset_page(
+        rfqs, RFQ.id, query.cursor, query.limit, query.order == "desc"
     )
 
     data = [
@@ -42,6 +82,7 @@ def get_rfq_data():
             if rfq.response_time
             else None,
             "status": rfq.status.value,
+            "mail_status": rfq.mail_status.value if rfq.mail_status else None,
             "procurement_id": rfq.procurement_id,
             "vendor_name": rfq.vendor_name,
         }
@@ -49,7 +90,9 @@ def get_rfq_data():
     ]
 
     app.logger.debug(f"{g.user['email']} | Returning RFQ data")
-    return DataResponse(data).to_response()
+    return DataResponse(
+        data, headers=page_headers(next_cursor), etag=g.etag
+    ).to_response()
 
 
 @rfq_routes.route("/add_rfq", methods=["POST"])
@@ -66,6 +109,7 @@ def add_rfq(body: AddRFQRequest):
     app.logger.debug(procurement_items)
 
     rfqs = []
+    mails = []
     for vendor_id in body.vendors:
         rfq_id = next(gen)
         rfq_token = jwt.encode(
@@ -80,27 +124,42 @@ def add_rfq(body: AddRFQRequest):
             vendor_id=vendor_id,
             procurement_items=procurement_items,
             token=rfq_token,
+            mail_status=MailStatus.QUEUED,
         )
         rfqs.append(rfq)
+        mails.append((rfq_id, vendor_id, rfq_token))
 
     db.session.add_all(rfqs)
-    db.session.commit()
+    refresh_vendor_suggestions(body.vendors)
 
-    app.logger.debug(f"{g.user['email']} | added rfq")
-
-    for rfq in rfqs:
-        rfq_link = url_for("rfq_routes.view_rfq", token=rfq.token, _external=True)
-        app.logger.debug(f"RFQ Link: {rfq_link}")
-
-        msg = Message(
-            "New RFQ Created",
-            recipients=[rfq.vendor.email],
-            html=render_template(
-                "rfq_email.html", rfq_link=rfq_link, vendor=rfq.vendor.name
-            ),
+    vendors = {
+        vendor.id: vendor
+        for vendor in db.session.query(Vendor.id, Vendor.name, Vendor.email).filter(
+            Vendor.id.in_(body.vendors)
         )
+    }
+    rfq_link = url_builder("rfq_routes.view_rfq")
+    emails = render_many(
+        "rfq_email.html",
+        (
+            {
+                "rfq_link": rfq_link(token=rfq_token),
+                "vendor": vendors[vendor_id].name,
+            }
+            for _, vendor_id, rfq_token in mails
+        ),
+    )
+    enqueue_mails(
+        RFQ_MAIL_JOB,
+        (
+            (rfq_id, "New RFQ Created", [vendors[vendor_id].email], html)
+            for (rfq_id, vendor_id, _), html in zip(mails, emails)
+        ),
+    )
+    # The outbox is committed with the RFQs, so every queued RFQ gets its email
+    db.session.commit()
 
-        mail.send(msg)
+    app.logger.debug(f"{g.user['email']} | added rfq")
 
     # Emit socket event for data change
     for rfq in rfqs:
@@ -108,7 +167,7 @@ def add_rfq(body: AddRFQRequest):
 
     return Response(
         code="crud/add",
-        message="RFQs have been successfully created, and notification emails have been sent to the respective vendors.",
+        message="RFQs have been successfully created, and notification emails are being sent to the respective vendors.",
         status_code=201,
     ).to_response()
 
@@ -236,8 +295,11 @@ def submit_rfq_response(body: RFQSubmission):
             procurement_item.unit_price = submitted_item.unit_price  # type: ignore
 
         rfq.response_time = datetime.now()
+        refresh_vendor_suggestions([rfq.vendor_id])
         # Commit changes to the database
         db.session.commit()
+        data_versions.bump("rfq")
+        data_versions.bump("procurement")
 
         return jsonify(
             {"code": "success", "message": "RFQ response submitted successfully."}
@@ -292,6 +354,7 @@ def submit_order(body: PurchaseRequest):
         rfq.status = RFQStatus.ORDERED
         rfq.response_time = datetime.utcnow()
         db.session.commit()
+        data_versions.bump("rfq")
 
         return jsonify(
             {
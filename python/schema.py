@@ -1,6 +1,8 @@
-from typing import Optional, Union
+from datetime import datetime
+from decimal import Decimal
+from typing import Literal, Optional, Union
 
-from pydantic import BaseModel, EmailStr, constr
+from pydantic import BaseModel, EmailStr, conint, constr, field_validator
 from typing_extensions import Annotated
 
 
@@ -55,3 +57,40 @@ class AddRFQRequest(BaseModel):
     id: str
     items: list[str]
     vendors: list[str]
+
+
+class ProcurementLine(BaseModel):
+    id: str
+    quantity: Optional[int] = None
+    price: Optional[Decimal] = None
+
+    @field_validator("quantity", "price", mode="before")
+    @classmethod
+    def empty_as_none(cls, value):
+        # Blank CSV cells
+        return None if value == "" else value
+
+
+class SuggestionQuery(BaseModel):
+    limit: conint(gt=0, le=100) = 20
+
+
+class ResyncQuery(BaseModel):
+    since: Optional[int] = None
+
+
+class DataPageQuery(BaseModel):
+    cursor: Optional[str] = None
+    limit: Optional[conint(gt=0, le=1000)] = None
+    order: Literal["asc", "desc"] = "asc"
+    category: Optional[int] = None
+    approved: Optional[bool] = None
+    status: Optional[Literal["enabled", "disabled", "ordered"]] = None
+    date_from: Optional[datetime] = None
+    date_to: Optional[datetime] = None
+
+
+class UserPageQuery(BaseModel):
+    cursor: Optional[str] = None
+    limit: Optional[conint(gt=0, le=1000)] = None
+    search: Optional[str] = None
@@ -1,17 +1,164 @@
+import hashlib
 import os
 from datetime import datetime
+from itertools import islice
 
-import dateparser
 import pandas as pd
-from database import Review, Vendor, db
+from database import (
+    Review,
+    SentimentCache,
+    Vendor,
+    db,
+    refresh_vendor_suggestions,
+)
 from flask import current_app as app
-from googlemaps import GoogleMapsScraper
+from googlemaps import GoogleMapsScraper, ScrapedReview, records_to_frame
+from relative_date import resolve_relative_date
+from sqlalchemy import func, insert, tuple_, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from transformers import AutoTokenizer, pipeline
-from utils import emit_data_change
 from webdriver_manager.chrome import ChromeDriverManager
 
 from python.response import ResourceNotFoundException
 
+SENTIMENT_MODEL = "bhadresh-savani/albert-base-v2-emotion"
+SENTIMENT_BATCH_SIZE = 16
+
+sentiment_analyzer = None
+
+
+def get_sentiment_analyzer():
+    """Returns the process-wide sentiment pipeline, loading it on first use."""
+    global sentiment_analyzer
+    if sentiment_analyzer is None:
+        tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_MODEL)
+        sentiment_analyzer = pipeline(
+            "text-classification",
+            model=SENTIMENT_MODEL,
+            tokenizer=tokenizer,
+            top_k=1,
+            max_length=512,
+            truncation=True,
+        )
+    return sentiment_analyzer
+
+
+def classify_captions(captions):
+    """
+    Runs the captions through the sentiment pipeline in batches, padding each
+    batch to its longest caption. Returns one (label, score) pair per caption.
+    """
+    if not captions:
+        return []
+
+    results = get_sentiment_analyzer()(captions, batch_size=SENTIMENT_BATCH_SIZE)
+
+    classified = []
+    for result in results:
+        top = result[0] if isinstance(result, list) else result
+        classified.append((str(top["label"]), float(top["score"])))
+    return classified
+
+
+SENTIMENT_CACHE_SIZE = 100_000
+SENTIMENT_EVICT_INTERVAL = 1_000
+
+sentiment_cache_inserts = 0
+
+
+def caption_hash(caption):
+    return hashlib.sha256(caption.encode("utf-8")).hexdigest()
+
+
+def evict_sentiment_cache():
+    """Drops the least recently used entries beyond `SENTIMENT_CACHE_SIZE`."""
+    cutoff = (
+        db.session.query(SentimentCache.last_used)
+        .order_by(SentimentCache.last_used.desc())
+        .offset(SENTIMENT_CACHE_SIZE)
+        .limit(1)
+        .scalar()
+    )
+    if cutoff is not None:
+        SentimentCache.query.filter(SentimentCache.last_used < cutoff).delete(
+            synchronize_session=False
+        )
+
+
+def insert_sentiments(rows):
+    """
+    Inserts sentiment cache rows, keeping the existing row when another worker
+    or an earlier attempt already cached the same (review_id, caption_hash).
+    Evicts old entries once every `SENTIMENT_EVICT_INTERVAL` inserted rows.
+    """
+    global sentiment_cache_inserts
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql_insert(SentimentCache).on_duplicate_key_update(
+            last_used=func.now()
+        )
+    elif dialect == "sqlite":
+        statement = sqlite_insert(SentimentCache).on_conflict_do_nothing()
+    else:
+        statement = insert(SentimentCache)
+    db.session.execute(statement, rows)
+
+    sentiment_cache_inserts += len(rows)
+    if sentiment_cache_inserts >= SENTIMENT_EVICT_INTERVAL:
+        sentiment_cache_inserts = 0
+        evict_sentiment_cache()
+
+
+def classify_reviews(review_ids, captions):
+    """
+    Same as `classify_captions`, but looks each review up in the persistent
+    sentiment cache first, keyed by review id and caption hash. Only captions
+    missing from the cache go through the model.
+    """
+    keys = [
+        (review_id or "", caption_hash(caption))
+        for review_id, caption in zip(review_ids, captions)
+    ]
+    hashes = {key[1] for key in keys}
+
+    cached = {
+        (entry.review_id, entry.caption_hash): (entry.label, entry.score)
+        for entry in SentimentCache.query.filter(
+            SentimentCache.caption_hash.in_(hashes)
+        )
+    }
+
+    missing = {
+        key: caption for key, caption in zip(keys, captions) if key not in cached
+    }
+    fresh = classify_captions(list(missing.values()))
+    if len(fresh) != len(missing):
+        return []
+
+    hits = set(keys) & cached.keys()
+    if hits:
+        SentimentCache.query.filter(
+            tuple_(SentimentCache.review_id, SentimentCache.caption_hash).in_(hits)
+        ).update({"last_used": func.now()}, synchronize_session=False)
+
+    if missing:
+        insert_sentiments(
+            [
+                {
+                    "review_id": review_id,
+                    "caption_hash": hashed,
+                    "label": label,
+                    "score": score,
+                }
+                for (review_id, hashed), (label, score) in zip(missing, fresh)
+            ]
+        )
+
+    cached.update(zip(missing, fresh))
+    return [cached[key] for key in keys]
+
 
 def init_scraper(app):
     install_dir = os.path.join(os.getcwd(), "lib")
@@ -65,100 +212,202 @@ def init_scraper(app):
 
 ind = {"most_relevant": 0, "newest": 1, "highest_rating": 2, "lowest_rating": 3}
 
-HEADER = [
-    "id_review",
-    "caption",
-    "relative_date",
-    "retrieval_date",
-    "rating",
-    "username",
-    "n_review_user",
-    "url_user",
-]
-
 
 def scape_reviews(keywords, review_counts=50):
     with GoogleMapsScraper() as scraper:
-        df_places = scraper.get_places(keyword_list=keywords)
-        url = df_places.iloc[0]["href"]
-        error = scraper.sort_by(url, ind["newest"])
+        place = next(scraper.iter_places(keyword_list=keywords), None)
+        if place is None:
+            app.logger.debug(f"No place found for {keywords}")
+            return pd.DataFrame()
 
-        if error == 0:
-            all_reviews = []
-            n = 0
-
-            while n < review_counts:
-                reviews = scraper.get_reviews(n)
-                if len(reviews) == 0:
-                    break
-
-                for r in reviews:
-                    row_data = list(r.values())
-                    all_reviews.append(row_data)
+        error = scraper.sort_by(place.href, ind["newest"])
 
-                n += len(reviews)
+        if error == 0:
+            reviews = islice(scraper.iter_reviews(), review_counts)
+            df_reviews = records_to_frame(reviews, ScrapedReview)
 
-            if all_reviews:
-                df_reviews = pd.DataFrame(all_reviews, columns=HEADER)
+            if not df_reviews.empty:
                 # df_reviews.to_csv("reviews_output.csv", index=False)
                 return df_reviews
             else:
                 app.logger.debug(f"No reviews found for {keywords}")
 
-        return pd.DataFrame()
-
-
-def compute_gred(df_reviews: pd.DataFrame):
-    model_name = "bhadresh-savani/albert-base-v2-emotion"
-    tokenizer = AutoTokenizer.from_pretrained(model_name)
-    sentiment_analyzer = pipeline(
-        "text-classification",
-        model=model_name,
-        tokenizer=tokenizer,
-        top_k=1,
-        max_length=512,
-        padding="max_length",
-        truncation=True,
+    return pd.DataFrame()
+
+
+SENTIMENT_MAPPING = dict(
+    joy=1.0,
+    love=0.9,
+    surprise=0.7,
+    sadness=-0.6,
+    fear=-0.8,
+    anger=-0.9,
+    neutral=0.0,
+)
+
+
+def score_reviews(df_reviews: pd.DataFrame):
+    """
+    Computes the GRED of every review in one vectorized pass over the
+    `rating`, `sentiment_label` and `sentiment_score` columns. Reviews without
+    a sentiment are scored on their rating alone.
+    """
+    rating_score = df_reviews["rating"].astype(float) / 5 * 100
+    sentiment_factor = (
+        df_reviews["sentiment_label"].map(SENTIMENT_MAPPING).astype(float).fillna(0.0)
     )
-
-    sentiment_mapping = dict(
-        joy=1.0,
-        love=0.9,
-        surprise=0.7,
-        sadness=-0.6,
-        fear=-0.8,
-        anger=-0.9,
-        neutral=0.0,
+    combined = (
+        df_reviews["sentiment_score"].astype(float) * 100 * sentiment_factor * 0.5
+        + rating_score * 0.5
     )
+    return combined.where(df_reviews["sentiment_label"].notna(), rating_score)
 
-    gred_scores = []
 
-    for _, review in df_reviews.iterrows():
-        rating = review["rating"]
-        caption = review["caption"]
-
-        if pd.notna(caption):
-            result = sentiment_analyzer(caption)
-
-            if result and isinstance(result, list) and len(result) > 0:
-                sentiment_label = str(result[0][0]["label"])
-                sentiment_score = float(result[0][0]["score"])
+def compute_gred(df_reviews: pd.DataFrame):
+    df_reviews["sentiment_label"] = None
+    df_reviews["sentiment_score"] = float("nan")
+
+    has_caption = df_reviews["caption"].notna()
+    captions = df_reviews.loc[has_caption, "caption"].astype(str).tolist()
+    review_ids = (
+        df_reviews.loc[has_caption, "id_review"].tolist()
+        if "id_review" in df_reviews
+        else [None] * len(captions)
+    )
+    results = classify_reviews(review_ids, captions)
 
-                sentiment_factor = sentiment_mapping.get(sentiment_label, 0.0)
+    if len(results) != len(captions):
+        app.logger.debug("Scrapped reviews infer result is not filled list")
+        return
 
-                combined_gred = (sentiment_score * 100 * sentiment_factor * 0.5) + (
-                    rating / 5 * 100 * 0.5
+    if results:
+        labels, scores = zip(*results)
+        df_reviews.loc[has_caption, "sentiment_label"] = labels
+        df_reviews.loc[has_caption, "sentiment_score"] = scores
+
+    if df_reviews.empty:
+        return 0
+
+    return float(score_reviews(df_reviews).mean())
+
+
+def rescore_vendors(vendor_ids=None):
+    """
+    Recomputes the GRED of vendors from their stored reviews and sentiments,
+    without scraping or running the model. Vendors with captioned reviews that
+    predate stored sentiments are skipped. Returns the updated vendor ids.
+    """
+    query = db.session.query(
+        Review.vendor_id,
+        Review.rating,
+        Review.sentiment_label,
+        Review.sentiment_score,
+        Review.caption.isnot(None),
+    )
+    if vendor_ids is not None:
+        query = query.filter(Review.vendor_id.in_(vendor_ids))
+
+    df_reviews = pd.DataFrame(
+        query.all(),
+        columns=[
+            "vendor_id",
+            "rating",
+            "sentiment_label",
+            "sentiment_score",
+            "has_caption",
+        ],
+    )
+    unscored = df_reviews["has_caption"] & df_reviews["sentiment_label"].isna()
+    df_reviews = df_reviews[
+        ~df_reviews["vendor_id"].isin(df_reviews.loc[unscored, "vendor_id"])
+    ]
+    if df_reviews.empty:
+        return []
+
+    grades = score_reviews(df_reviews).groupby(df_reviews["vendor_id"]).mean()
+
+    db.session.execute(
+        update(Vendor),
+        [{"id": vendor_id, "gred": float(gred)} for vendor_id, gred in grades.items()],
+    )
+    refresh_vendor_suggestions(grades.index.tolist())
+    db.session.commit()
+
+    return grades.index.tolist()
+
+
+def resolve_relative_dates(relative_dates: pd.Series, base: datetime):
+    """
+    Resolves relative dates such as "2 weeks ago" against `base`. Each
+    distinct string is resolved once, as the scraped vocabulary is tiny.
+    """
+    resolved = {
+        relative_date: resolve_relative_date(relative_date, base)
+        for relative_date in relative_dates.dropna().unique()
+    }
+    return relative_dates.map(resolved)
+
+
+def store_reviews(vendor_id, df_reviews: pd.DataFrame):
+    """
+    Syncs the stored reviews of a vendor with the scraped ones in bulk.
+    Reviews are matched on their Google review id: unchanged ones are kept
+    as is, edited ones are updated, and the rest are deleted or inserted.
+    """
+    df_reviews = df_reviews.assign(
+        date=resolve_relative_dates(
+            df_reviews["relative_date"], df_reviews["retrieval_date"].max()
+        )
+    )
+    df_reviews = df_reviews[df_reviews["date"].notna()]
+    df_reviews = df_reviews.astype(object).where(df_reviews.notna(), None)
+
+    existing = {
+        review.source_id: review
+        for review in db.session.query(
+            Review.id,
+            Review.source_id,
+            Review.rating,
+            Review.caption,
+            Review.sentiment_label,
+            Review.sentiment_score,
+        ).filter(Review.vendor_id == vendor_id)
+    }
+    existing.pop(None, None)
+
+    inserts, updates, kept = [], [], set()
+    for review in df_reviews.itertuples(index=False):
+        values = {
+            "rating": review.rating,
+            "caption": review.caption,
+            "sentiment_label": review.sentiment_label,
+            "sentiment_score": review.sentiment_score,
+        }
+        stored = existing.get(review.id_review)
+
+        if stored is None or stored.id in kept:
+            inserts.append(
+                dict(
+                    values,
+                    vendor_id=vendor_id,
+                    source_id=review.id_review,
+                    date=review.date,
                 )
-                gred_scores.append(combined_gred)
-            else:
-                app.logger.debug("Scrapped reviews infer result is not filled list")
-                return
-        else:
-            gred_scores.append(rating / 5 * 100)
+            )
+            continue
 
-    overall_gred = sum(gred_scores) / len(gred_scores) if len(gred_scores) > 0 else 0
+        kept.add(stored.id)
+        if any(getattr(stored, key) != value for key, value in values.items()):
+            updates.append(dict(values, id=stored.id))
 
-    return overall_gred
+    Review.query.filter(Review.vendor_id == vendor_id, Review.id.notin_(kept)).delete(
+        synchronize_session=False
+    )
+
+    if updates:
+        db.session.execute(update(Review), updates)
+    if inserts:
+        db.session.execute(insert(Review), inserts)
 
 
 def assess_vendor(id, name, address, app_context):
@@ -177,28 +426,7 @@ def assess_vendor(id, name, address, app_context):
 
             v.gred = gred or 0
 
-            Review.query.filter_by(vendor_id=id).delete()
-
-            for _, review in df_reviews.iterrows():
-                relative_date = review["relative_date"]
-                retrieval_date_str = review["retrieval_date"].strftime(
-                    "%Y-%m-%d %H:%M:%S.%f"
-                )
-                retrieval_date = datetime.strptime(
-                    retrieval_date_str, "%Y-%m-%d %H:%M:%S.%f"
-                )
-
-                res = dateparser.parse(
-                    relative_date, settings={"RELATIVE_BASE": retrieval_date}
-                )
-                db.session.add(
-                    Review(
-                        vendor_id=id,
-                        rating=review["rating"],
-                        caption=review["caption"],
-                        date=res,
-                    )
-                )
+            store_reviews(id, df_reviews)
+            refresh_vendor_suggestions([id])
 
             db.session.commit()
-            emit_data_change("cast", "modify", v)
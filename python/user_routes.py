@@ -1,7 +1,9 @@
 import os
+import threading
 from datetime import datetime, timedelta
 from typing import Optional
 
+import gevent
 import jwt
 from database import Position
 from error_routes import render_error_template
@@ -23,17 +25,31 @@ from flask_mail import Message
 from flask_pydantic import validate
 from pydantic import EmailStr
 from utils import (
+    SocketDataKey,
     check_token,
+    data_change_log,
+    data_versions,
     emit_data_change,
     mail,
     on_ajax_render,
     remove_photo,
     upload_photo,
+    versioned,
 )
 from werkzeug.datastructures import FileStorage
 
-from python.response import DataResponse, InvalidUserException, Response
-from python.schema import UpdateUserData, UserRegistrationData, VerifyEmailQuery
+from python.response import (
+    DataResponse,
+    InvalidUserException,
+    Response,
+    page_headers,
+)
+from python.schema import (
+    UpdateUserData,
+    UserPageQuery,
+    UserRegistrationData,
+    VerifyEmailQuery,
+)
 
 user_routes = Blueprint("user_routes", __name__)
 
@@ -57,6 +73,123 @@ def extract_user_info(user: auth.UserRecord):
     }
 
 
+USER_DIRECTORY_REFRESH = 5 * 60
+USER_SEARCH_FIELDS = ("name", "username", "email", "phoneNo")
+
+
+class UserDirectory:
+    """
+    In-memory copy of the verified Firebase users, as returned by
+    `extract_user_info`. It is rebuilt periodically in the background, patched
+    in place by the handlers that modify users, and catches up with the user
+    changes made by other workers through the data change log.
+    """
+
+    def __init__(self):
+        self.users = {}
+        self.seq = None
+        self.loaded = False
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        seq, _ = data_change_log.since(SocketDataKey.users.name)
+        users = {}
+        page = auth.list_users()
+
+        while page:
+            for user in page.users:
+                if user.email_verified:
+                    users[user.uid] = extract_user_info(user)
+
+            page = page.get_next_page()
+
+        with self.lock:
+            # Changes made outside the app only show up when rebuilding
+            if self.loaded and users != self.users:
+                data_versions.bump(SocketDataKey.users.name)
+
+            self.users = users
+            self.seq = seq
+            self.loaded = True
+
+    def sync(self):
+        seq, events = data_change_log.since(SocketDataKey.users.name, self.seq)
+        if events is None:
+            self.refresh()
+            return
+
+        with self.lock:
+            for event in events:
+                user = json.loads(event["data"])
+                if event["type"] == "delete":
+                    self.users.pop(user["id"], None)
+                elif not event["delta"]:
+                    self.users[user["id"]] = user
+                elif user["id"] in self.users:
+                    self.users[user["id"]] = {**self.users[user["id"]], **user}
+
+            self.seq = seq
+
+    def upsert(self, user: UserRecord):
+        with self.lock:
+            if user.email_verified:
+                self.users[user.uid] = extract_user_info(user)
+            else:
+                self.users.pop(user.uid, None)
+
+    def remove(self, uid):
+        with self.lock:
+            self.users.pop(uid, None)
+
+    def page(self, cursor=None, limit=None, search=None):
+        """Returns the users ordered by uid after `cursor`, and the next cursor."""
+        if self.loaded:
+            self.sync()
+        else:
+            self.refresh()
+
+        with self.lock:
+            users = sorted(self.users.values(), key=lambda user: user["id"])
+
+        if search:
+            search = search.lower()
+            users = [
+                user
+                for user in users
+                if any(
+                    search in str(user.get(field) or "").lower()
+                    for field in USER_SEARCH_FIELDS
+                )
+            ]
+
+        if cursor:
+            users = [user for user in users if user["id"] > cursor]
+
+        if limit is None or len(users) <= limit:
+            return users, None
+
+        return users[:limit], users[limit - 1]["id"]
+
+
+user_directory = UserDirectory()
+
+
+def init_user_directory(app):
+    """Spawns a greenlet that periodically rebuilds the user directory."""
+
+    def refresh():
+        while True:
+            try:
+                user_directory.refresh()
+            except Exception as e:
+                app.logger.exception(f"Error refreshing user directory: {e}")
+
+            gevent.sleep(USER_DIRECTORY_REFRESH)
+
+    gevent.spawn(refresh)
+    app.logger.info("User directory successfully initialized")
+
+
 @user_routes.route("/account")
 @on_ajax_render("account.html")
 def login():
@@ -100,6 +233,7 @@ def create_google_user():
         email_verified=True,
         custom_claims={"role": Position.executive.name},
     )
+    user_directory.upsert(user_record)
     emit_data_change(
         g.user["uid"],
         "add",
@@ -182,23 +316,15 @@ def create_email_user(body: UserRegistrationData):
 
 @user_routes.route("/get_users_data")
 @check_token(Position.admin)
-def get_users_data():
+@versioned(SocketDataKey.users.name)
+@validate()
+def get_users_data(query: UserPageQuery):
     app.logger.debug(f"{g.user['email']} | Request users data")
-    users = []
-    page = auth.list_users()
+    users, next_cursor = user_directory.page(query.cursor, query.limit, query.search)
 
-    while page:
-        for user in page.users:
-            user: UserRecord
-
-            if user.email_verified:
-                user_data = extract_user_info(user)
-
-            users.append(user_data)
-
-        page = page.get_next_page()
-
-    return DataResponse(data=users).to_response()
+    return DataResponse(
+        data=users, headers=page_headers(next_cursor), etag=g.etag
+    ).to_response()
 
 
 @user_routes.route("/update_user", methods=["POST"])
@@ -243,10 +369,15 @@ def update_user(form: UpdateUserData):
 
     if updates:
         user_record = auth.update_user(target_uid, **updates)
+    else:
+        # Re-read the record so that it carries the new custom claims
+        user_record = auth.get_user(target_uid)
 
     if request_user_id != target_uid:
         auth.revoke_refresh_tokens(target_uid)
 
+    user_directory.upsert(user_record)
+
     emit_data_change(
         g.user["uid"],
         "modify",
@@ -288,6 +419,7 @@ def is_email_verified(email: EmailStr):
 @check_token(Position.admin)
 def delete_vendor(uid):
     auth.delete_user(uid)
+    user_directory.remove(uid)
 
     emit_data_change(g.user["uid"], "delete", None, "users", json.dumps({"id": uid}))
     return jsonify(
@@ -312,6 +444,7 @@ def verify_email(query: VerifyEmailQuery):
             email_verified=True,
             custom_claims={"role": Position.executive.name},
         )
+        user_directory.upsert(user_record)
 
         emit_data_change(
             user.uid,
@@ -1,5 +1,9 @@
+import hashlib
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
 from enum import Enum
 from functools import wraps
 from typing import Optional
@@ -7,23 +11,27 @@ from urllib.parse import urlparse
 
 import bleach
 import firebase_admin
+import gevent
 from database import (
     Position,
 )
 from dotenv import load_dotenv
+from fanout import SQLiteDataChangeLog, SQLiteDataVersions, SQLiteResponseCache
 from firebase_admin import auth, credentials, storage
+from flask import Response as FlaskResponse
 from flask import current_app as app
-from flask import g, json, jsonify, request
+from flask import g, json, jsonify, make_response, request
 from flask.app import Flask
 from flask.helpers import abort
 from flask.templating import render_template
 from flask_mail import Mail
-from flask_socketio import emit
 from openai import OpenAI, Stream
 from openai.types.chat import ChatCompletion
 from PIL import Image
 from werkzeug.datastructures import MultiDict
 
+from python.response import DataResponse, is_not_modified
+
 load_dotenv()
 
 mail = Mail()
@@ -34,6 +42,73 @@ client = OpenAI()
 
 bucket = storage.bucket()
 
+TOKEN_CACHE_SIZE = 1024
+TOKEN_CLOCK_SKEW = 10
+
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified ID token claims, keyed by the token's hash.
+    Entries expire at the token's `exp` minus the allowed clock skew.
+    """
+
+    def __init__(self, maxsize=TOKEN_CACHE_SIZE, clock_skew=TOKEN_CLOCK_SKEW):
+        self.maxsize = maxsize
+        self.clock_skew = clock_skew
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token):
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token):
+        key = self.key(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, token, claims):
+        expires_at = claims.get("exp", 0) - self.clock_skew
+        if expires_at <= time.time():
+            return
+
+        with self.lock:
+            self.entries[self.key(token)] = (expires_at, claims)
+            self.entries.move_to_end(self.key(token))
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+token_cache = TokenCache()
+
+
+def verify_token(token):
+    """Verifies a Firebase ID token, reusing the claims of recently seen tokens."""
+    user = token_cache.get(token)
+    if user is None:
+        user = auth.verify_id_token(token, clock_skew_seconds=TOKEN_CLOCK_SKEW)
+        token_cache.put(token, user)
+    return user
+
 
 def get_bearer_token():
     auth_header = request.headers.get("Authorization")
@@ -50,10 +125,15 @@ def check_token(required_role: Optional[Position] = None):
             try:
                 token = get_bearer_token()
 
+                # Websocket-only Socket.IO clients cannot set headers and send
+                # the token in the connect handler's auth payload instead
+                if not token and args and isinstance(args[0], dict):
+                    token = args[0].get("token")
+
                 if not token:
                     abort(403)
 
-                user = auth.verify_id_token(token, clock_skew_seconds=10)
+                user = verify_token(token)
             except Exception as e:
                 app.logger.exception(f"Error verifying token: {e}")
                 abort(403)
@@ -291,6 +371,310 @@ class SocketDataKey(Enum):
     rfq = Position.executive
 
 
+DATA_CHANGE_SNAPSHOTS = 10_000
+DATA_CHANGE_LOG_SIZE = 1000
+DATA_CHANGE_WINDOW = 0.05
+DATA_CHANGE_BATCH_SIZE = 100
+
+
+def data_change_event(uid, type, dtype, item, previous=None):
+    """
+    Builds the event broadcast for a change of `item`. Modifications are sent
+    as field-level deltas against `previous`, the last version broadcast for
+    the object, and yield None when nothing changed.
+    """
+    data, delta = item, False
+
+    if type == "modify" and previous is not None:
+        changes = {
+            field: value
+            for field, value in item.items()
+            if field not in previous or previous[field] != value
+        }
+        if not changes:
+            return None
+
+        data, delta = {"id": item.get("id"), **changes}, True
+
+    return {
+        "uid": uid,
+        "type": type,
+        "dtype": dtype,
+        "data": json.dumps(data),
+        "delta": delta,
+    }
+
+
+class DataChangeLog:
+    """
+    Numbers the data-change events of each data key and keeps the latest ones
+    so that clients that missed some can replay them. State is kept in this
+    process; `SQLiteDataChangeLog` shares it between workers.
+    """
+
+    def __init__(
+        self, max_snapshots=DATA_CHANGE_SNAPSHOTS, log_size=DATA_CHANGE_LOG_SIZE
+    ):
+        self.max_snapshots = max_snapshots
+        self.snapshots = OrderedDict()
+        self.sequences = defaultdict(int)
+        self.events = defaultdict(lambda: deque(maxlen=log_size))
+        self.lock = threading.Lock()
+
+    def record(self, uid, type, dtype, data):
+        """
+        Returns the event to broadcast for a change, or None when a
+        modification leaves the object as it was last broadcast.
+        """
+        item = json.loads(data)
+        key = (dtype, item.get("id"))
+
+        with self.lock:
+            previous = self.snapshots.pop(key, None)
+
+            if type != "delete":
+                self.snapshots[key] = item
+                while len(self.snapshots) > self.max_snapshots:
+                    self.snapshots.popitem(last=False)
+
+            event = data_change_event(uid, type, dtype, item, previous)
+            if event is None:
+                return None
+
+            self.sequences[dtype] += 1
+            event["seq"] = self.sequences[dtype]
+            self.events[dtype].append(event)
+
+        return event
+
+    def since(self, dtype, seq=None):
+        """
+        Returns the current sequence number of `dtype` and the events after
+        `seq`, or None instead of the events if some are no longer logged.
+        """
+        with self.lock:
+            current = self.sequences[dtype]
+            if seq is None or seq == current:
+                return current, []
+
+            events = [event for event in self.events[dtype] if event["seq"] > seq]
+            if seq > current or not events or events[0]["seq"] != seq + 1:
+                return current, None
+
+            return current, events
+
+
+# Workers sharing a message queue must also share the log
+data_change_log = (
+    SQLiteDataChangeLog(data_change_event, log_size=DATA_CHANGE_LOG_SIZE)
+    if os.environ.get("SOCKETIO_MESSAGE_QUEUE")
+    else DataChangeLog()
+)
+
+
+class DataVersions:
+    """
+    Version stamp of each data key, bumped on every change. Stamps start at the
+    process start time so that they are not reused after a restart.
+    """
+
+    def __init__(self):
+        self.started = time.time_ns()
+        self.versions = {}
+        self.lock = threading.Lock()
+
+    def bump(self, dtype):
+        with self.lock:
+            version = self.versions.get(dtype, self.started)
+            self.versions[dtype] = max(time.time_ns(), version + 1)
+
+    def get(self, dtypes):
+        with self.lock:
+            return [self.versions.get(dtype, self.started) for dtype in dtypes]
+
+
+data_versions = (
+    SQLiteDataVersions() if os.environ.get("SOCKETIO_MESSAGE_QUEUE") else DataVersions()
+)
+
+
+class DataChangeBatcher:
+    """
+    Buffers the data changes of each room for `window` seconds, merging the
+    changes made to the same object, then broadcasts them in batches of at
+    most `batch_size` events. The data version is bumped once the events are
+    logged, so that readers of the log never see a version ahead of it.
+    """
+
+    def __init__(
+        self,
+        log,
+        versions,
+        window=DATA_CHANGE_WINDOW,
+        batch_size=DATA_CHANGE_BATCH_SIZE,
+    ):
+        self.log = log
+        self.versions = versions
+        self.window = window
+        self.batch_size = batch_size
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def add(self, uid, type, dtype, data):
+        key = json.loads(data).get("id")
+
+        with self.lock:
+            changes = self.pending.get(dtype)
+            if changes is None:
+                changes = self.pending[dtype] = OrderedDict()
+                gevent.spawn_later(
+                    self.window, self.flush, app._get_current_object(), dtype
+                )
+
+            previous = changes.pop(key, None)
+            if previous is not None and previous[1] == "add":
+                # Objects added and removed within the window are never sent
+                if type == "delete":
+                    return
+                type = "add"
+
+            changes[key] = (uid, type, data)
+
+    def flush(self, app, dtype):
+        with self.lock:
+            changes = self.pending.pop(dtype, {})
+
+        try:
+            events = [
+                event
+                for event in (
+                    self.log.record(uid, type, dtype, data)
+                    for uid, type, data in changes.values()
+                )
+                if event is not None
+            ]
+        finally:
+            # Cached responses must go stale even if logging failed
+            self.versions.bump(dtype)
+
+        socketio = app.extensions["socketio"]
+        for start in range(0, len(events), self.batch_size):
+            socketio.emit(
+                "data-changes",
+                events[start : start + self.batch_size],
+                to=dtype,
+                namespace="/data",
+            )
+
+
+data_change_batcher = DataChangeBatcher(data_change_log, data_versions)
+
+
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 300
+RESPONSE_CACHE_MAX_BODY = 2 * 1024 * 1024
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of serialized responses, keyed by their ETag. Since the
+    ETag covers the versions of the data a response is built from, a change
+    makes the entries built from the previous data unreachable; they are
+    evicted as the cache fills up or after `ttl` seconds.
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Returns the headers and body cached under `key`, or None."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] <= time.time():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, key, headers, body):
+        with self.lock:
+            self.entries[key] = (time.time() + self.ttl, headers, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+response_cache = (
+    SQLiteResponseCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+    if os.environ.get("SOCKETIO_MESSAGE_QUEUE")
+    else ResponseCache()
+)
+
+
+def versioned(*dtypes):
+    """
+    Tags the response with an ETag derived from the request URL and the
+    versions of the data keys it is built from, and answers a matching
+    `If-None-Match` with 304 before the view runs. The view passes `g.etag`
+    on to its `DataResponse`.
+
+    Successful, non-streamed responses are kept in `response_cache` under
+    their ETag and served from there until one of the data keys changes.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrap(*args, **kwargs):
+            versions = data_versions.get(dtypes)
+            g.etag = hashlib.sha1(
+                json.dumps([request.full_path, versions]).encode()
+            ).hexdigest()
+
+            if is_not_modified(g.etag):
+                return DataResponse(None, etag=g.etag).to_response()
+
+            cached = response_cache.get(g.etag)
+            if cached is not None:
+                headers, body = cached
+                return FlaskResponse(body, headers=headers)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+
+            body = response.get_data()
+            if len(body) <= RESPONSE_CACHE_MAX_BODY:
+                headers = {
+                    name: value
+                    for name, value in response.headers.items()
+                    if name != "Content-Length"
+                }
+                response_cache.put(g.etag, headers, body)
+
+            return response
+
+        return wrap
+
+    return decorator
+
+
 def emit_data_change(uid, type, data_object=None, dtype=None, data=None):
     if data_object is not None:
         if dtype is None:
@@ -301,14 +685,4 @@ def emit_data_change(uid, type, data_object=None, dtype=None, data=None):
     if dtype is None or data is None:
         raise ValueError("Either data_object or both dtype and data must be provided.")
 
-    emit(
-        "data-change",
-        {
-            "uid": uid,
-            "type": type,
-            "dtype": dtype,
-            "data": data,
-        },
-        to=dtype,
-        namespace="/data",
-    )
+    data_change_batcher.add(uid, type, dtype, data)
@@ -1,27 +1,91 @@
-import gevent
-from database import Category, Position, Vendor, db
-from flask import Blueprint, g, jsonify
-from flask import current_app as app
-from scrap_gred import assess_vendor
-from utils import check_token, emit_data_change, require_fields
-
-from python.response import DataResponse, ResourceNotFoundException
+from database import (
+    Category,
+    Position,
+    Review,
+    Vendor,
+    db,
+    keyset_page,
+    refresh_vendor_suggestions,
+)
+from flask import Blueprint, g, json, jsonify
+from flask_pydantic import validate
+from jobs import job_queue
+from scrap_gred import rescore_vendors
+from utils import check_token, emit_data_change, require_fields, versioned
+
+from python.response import DataResponse, ResourceNotFoundException, page_headers
+from python.schema import DataPageQuery
 
 vendor_routes = Blueprint("vendor_routes", __name__)
 
 
+def emit_vendors(uid, type, vendors, extra=None):
+    """
+    Emits the summaries of `vendors`, aggregated in one query, merging in the
+    fields of `extra` keyed by vendor id.
+    """
+    extra = extra or {}
+    for data in Vendor.summaries(vendors):
+        data.update(extra.get(data["id"], {}))
+        emit_data_change(uid, type, None, Vendor.__tablename__, json.dumps(data))
+
+
+def report_assessment(jobs):
+    statuses = {job["key"]: job["status"] for job in jobs}
+    vendors = Vendor.with_payload().filter(Vendor.id.in_(statuses)).all()
+    emit_vendors(
+        "cast",
+        "modify",
+        vendors,
+        {vendor_id: {"assessment": status} for vendor_id, status in statuses.items()},
+    )
+
+
 @vendor_routes.route("/get_vendor_data", methods=["GET"])
 @check_token(Position.executive)
-def get_vendor_data():
-    categories = Category.query.all()
-    vendors = Vendor.query.all()
+@versioned("vendor")
+@validate()
+def get_vendor_data(query: DataPageQuery):
+    vendors = Vendor.with_payload()
+
+    if query.category is not None:
+        vendors = vendors.filter(Vendor.categories.any(Category.id == query.category))
+    if query.approved is not None:
+        vendors = vendors.filter(Vendor.approved == query.approved)
+
+    vendors, next_cursor = keyset_page(
+        vendors, Vendor.id, query.cursor, query.limit, query.order == "desc"
+    )
+
+    data = {"data": Vendor.summaries(vendors)}
+    # Later pages reuse the categories sent with the first one
+    if query.cursor is None:
+        data["categories"] = [category.as_dict() for category in Category.query.all()]
 
-    data = [vendor.as_dict() for vendor in vendors]
     return DataResponse(
-        data={
-            "data": data,
-            "categories": [category.as_dict() for category in categories],
-        }
+        data=data,
+        headers=page_headers(next_cursor),
+        etag=g.etag,
+    ).to_response()
+
+
+@vendor_routes.route("/get_vendor_reviews/<vendor_id>", methods=["GET"])
+@check_token(Position.executive)
+@versioned("vendor")
+@validate()
+def get_vendor_reviews(vendor_id, query: DataPageQuery):
+    reviews, next_cursor = keyset_page(
+        Review.query.filter(Review.vendor_id == vendor_id),
+        Review.id,
+        query.cursor,
+        query.limit,
+        query.order == "desc",
+    )
+
+    return DataResponse(
+        data=[review.as_dict() for review in reviews],
+        headers=page_headers(next_cursor),
+        etag=g.etag,
     ).to_response()
 
 
@@ -64,16 +128,17 @@ def upsert_vendor(data):
         db.session.add(vendor)
         db.session.commit()
 
+    refresh_vendor_suggestions([vendor.id])
+    db.session.commit()
+
     if name != old_name or address != old_address:
-        gevent.spawn(
-            assess_vendor,
+        job_queue.enqueue(
+            "assess_vendor",
             vendor.id,
-            vendor.name,
-            vendor.address,
-            app.app_context(),
+            {"id": vendor.id, "name": vendor.name, "address": vendor.address},
         )
 
-    emit_data_change(g.user["uid"], "modify" if vendor_id else "add", vendor)
+    emit_vendors(g.user["uid"], "modify" if vendor_id else "add", [vendor])
 
     return jsonify(
         {
@@ -108,8 +173,25 @@ def approve_vendor(vendor_id):
         raise ResourceNotFoundException("vendor", vendor_id)
 
     vendor.approved = True
+    refresh_vendor_suggestions([vendor.id])
     db.session.commit()
-    emit_data_change(g.user["uid"], "modify", vendor)
+    emit_vendors(g.user["uid"], "modify", [vendor])
     return jsonify(
         {"code": "crud/update", "message": "Vendor has been approved successfully."}
     ), 200
+
+
+@vendor_routes.route("/rescore_vendors", methods=["POST"])
+@check_token(Position.admin)
+def rescore_all_vendors():
+    vendor_ids = rescore_vendors()
+
+    vendors = Vendor.with_payload().filter(Vendor.id.in_(vendor_ids)).all()
+    emit_vendors(g.user["uid"], "modify", vendors)
+
+    return jsonify(
+        {
+            "code": "crud/update",
+            "message": f"{len(vendor_ids)} vendor(s) have been rescored successfully.",
+        }
+    ), 200
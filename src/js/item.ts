@@ -108,6 +108,29 @@ export async function initItemPage() {
         }
       );
 
+      dataManager?.setEventCallback(
+        "item",
+        "reconnect",
+        (
+          uid: string,
+          data: any,
+          dataset: any,
+          dataType: string,
+          eventType: string
+        ) => {
+          itemTable.clear();
+          itemTable.rows.add(dataset.data).draw(true);
+          itemTable.responsive.recalc();
+          showMessage(
+            `Reconnected to server. Data of type ${dataType} has been refreshed to latest.`,
+            {
+              mode: "toast",
+              position: "bottom-right",
+            }
+          );
+        }
+      );
+
       const photoDropzone = new Dropzone("#photo", {
         url: "/file/post",
         maxFiles: 1,
@@ -453,6 +476,12 @@ export async function initItemPage() {
           table.rows.add(initialData.data).draw();
           table.responsive.recalc();
 
+          TableAction.attachPageLoader({
+            table: table,
+            hasMore: () => dataManager.hasMore("item"),
+            loadMore: () => dataManager.loadMore("item"),
+          });
+
           TableAction.attachListeners({
             selector: "tr .edit-icon",
             table: table,
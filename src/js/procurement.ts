@@ -7,7 +7,7 @@ import { initInput } from ".";
 import { getCurrentUserToken } from "./auth";
 import { SocketDataManager } from "./socket";
 import { assert, mapToElement, TableAction, withBlock } from "./utils";
-import { showReviews } from "./vendor";
+import { openReviews } from "./vendor";
 
 export async function initProcurement() {
   return new Promise<() => void>(async (resolve, reject) => {
@@ -113,6 +113,24 @@ export async function initProcurement() {
         data.data
       );
 
+      // Load the next procurements as the list is scrolled to its end
+      const onSliderScroll = async () => {
+        const end = slider.scrollLeft + slider.clientWidth;
+        if (
+          end < slider.scrollWidth - 100 ||
+          !dataManager.hasMore("procurement")
+        )
+          return;
+
+        try {
+          procurementList.add(await dataManager.loadMore("procurement"));
+        } catch (error) {
+          console.error("Failed to load more procurements:", error);
+        }
+      };
+
+      slider.addEventListener("scroll", onSliderScroll);
+
       let procurementId;
 
       $("#procurement-list").on("click", ".procurement-list-item", function () {
@@ -272,8 +290,7 @@ export async function initProcurement() {
 
           if (target.classList.contains("badge")) {
             const d = (vendorList.get("id", vendorId).at(0) as any)._values;
-            showReviews(d, reviewTemplate, reviewList);
-            reviewModal.show();
+            openReviews(d, reviewTemplate, reviewList, reviewModal);
             return;
           }
 
@@ -420,6 +437,7 @@ export async function initProcurement() {
       rfqBtn.addEventListener("click", onRFQBtnClick);
 
       resolve(() => {
+        slider.removeEventListener("scroll", onSliderScroll);
         dataManager.unsubscribe();
         console.log("Register disposed");
       });
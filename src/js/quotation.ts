@@ -228,6 +228,12 @@ export async function initQuotation() {
           table.rows.add(initialData).draw();
           table.responsive.recalc();
 
+          TableAction.attachPageLoader({
+            table: table,
+            hasMore: () => dataManager.hasMore("rfq"),
+            loadMore: () => dataManager.loadMore("rfq"),
+          });
+
           // TableAction.attachListeners({
           //   selector: "tr .edit-icon",
           //   table: table,
@@ -159,21 +159,21 @@ export async function initReport() {
         dataManager = await SocketDataManager.getOrCreateInstance({
           item: "/get_item_data", // Endpoint for item data
         });
-        initialData = dataManager.getDataCache("item").data;
+        initialData = (await dataManager.loadAll("item")).data;
         break;
 
       case "vendorReviewGred":
         dataManager = await SocketDataManager.getOrCreateInstance({
           vendor: "/get_vendor_data", // Endpoint for vendor data
         });
-        initialData = dataManager.getDataCache("vendor").data;
+        initialData = (await dataManager.loadAll("vendor")).data;
         break;
       case "rfqCount":
       case "rfqResponseTime":
         dataManager = await SocketDataManager.getOrCreateInstance({
           rfq: "/get_rfq_data", // Endpoint for RFQ data
         });
-        initialData = dataManager.getDataCache("rfq");
+        initialData = await dataManager.loadAll("rfq");
         break;
 
       default:
@@ -195,7 +195,8 @@ export async function initReport() {
   });
   let initialData = [];
 
-  initialData = dataManager.getDataCache("vendor");
+  // Charts aggregate the whole dataset
+  initialData = await dataManager.loadAll("vendor");
   const d = chartsOption.vendorReviewGred;
   // @ts-ignore
   d.dataset[0].source = initialData.data;
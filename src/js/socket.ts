@@ -8,16 +8,23 @@ interface EventPayload {
   dtype: any;
   type: EventType;
   data: any;
+  seq?: number;
+  delta?: boolean;
 }
 
 export class SocketDataManager {
   private static instance: SocketDataManager | null = null;
+  private static pageSize: number = 200;
   private socket: Socket;
   private namespace: string = "/data";
   private dataKeys: string[] = [];
   private eventCallbacks: { [key: string]: { [event: string]: Function } } = {};
   private urlMap: { [key: string]: string } = {}; // Maps data keys to URLs
   private dataCache: { [key: string]: any } = {}; // Cache for initial data
+  private sequences: { [key: string]: number } = {}; // Last applied events
+  private cursors: { [key: string]: string | null } = {}; // Next page to load
+  private loading: { [key: string]: Promise<any[]> } = {};
+  private resyncs: { [key: string]: Promise<void> } = {};
   private authenticated: boolean;
   private reconnecting: boolean = false;
 
@@ -31,7 +38,10 @@ export class SocketDataManager {
       extraHeaders: {
         Authorization: `Bearer ${token}`,
       },
+      auth: { token },
       path: "/socket.io",
+      // Polling requests may reach different workers, a websocket stays on one
+      transports: ["websocket"],
       reconnectionAttempts: 5,
       reconnectionDelay: 1000,
       timeout: 5000,
@@ -101,6 +111,7 @@ export class SocketDataManager {
         this.socket.io.opts.extraHeaders = {
           Authorization: `Bearer ${token}`,
         };
+        this.socket.auth = { token };
         this.socket.disconnect().connect();
         this.authenticated = true;
         this.reconnecting = false;
@@ -148,7 +159,7 @@ export class SocketDataManager {
   private async fetchAllInitialData(token: string): Promise<void> {
     for (const key of this.dataKeys) {
       try {
-        this.dataCache[key] = await this.fetchInitialData(token, key);
+        await this.fetchKeyData(token, key);
         console.log(`Initial data loaded for ${key}:`, this.dataCache[key]);
       } catch (error) {
         console.error(`Failed to fetch initial data for ${key}:`, error);
@@ -156,6 +167,15 @@ export class SocketDataManager {
     }
   }
 
+  private async fetchKeyData(token: string, dataKey: string): Promise<void> {
+    // Read the event sequence first: events racing the fetch are replayed
+    // idempotently rather than lost
+    const { seq } = await this.fetchEvents(token, dataKey);
+    this.dataCache[dataKey] = await this.fetchInitialData(token, dataKey);
+    this.sequences[dataKey] = seq;
+  }
+
+  // Loads the first page only; later pages are loaded on demand by loadMore
   public async fetchInitialData(token: string, dataKey: string): Promise<any> {
     const url = this.urlMap[dataKey];
     if (!url) {
@@ -163,20 +183,90 @@ export class SocketDataManager {
     }
 
     try {
-      const response = await fetch(url, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
-      if (!response.ok)
+      const page = await this.fetchPage(token, url);
+      if (!page.response.ok)
         throw new Error(`Failed to fetch initial data for ${dataKey}`);
-      return await response.json();
+
+      this.cursors[dataKey] = page.response.headers.get("X-Next-Cursor");
+      return page.body;
     } catch (error) {
       console.error(`Error fetching initial data for ${dataKey}:`, error);
       throw error;
     }
   }
 
+  public hasMore(dataKey: string): boolean {
+    return !!this.cursors[dataKey];
+  }
+
+  // Appends the next page of a data key to its cache and returns the rows
+  // that were not cached yet, as some may have arrived through events
+  public loadMore(dataKey: string): Promise<any[]> {
+    if (!this.loading[dataKey]) {
+      this.loading[dataKey] = this.fetchNextPage(dataKey).finally(() => {
+        delete this.loading[dataKey];
+      });
+    }
+    return this.loading[dataKey];
+  }
+
+  // Loads every remaining page, for views that need the whole dataset
+  public async loadAll(dataKey: string): Promise<any> {
+    while (this.hasMore(dataKey)) {
+      await this.loadMore(dataKey);
+    }
+    return this.dataCache[dataKey];
+  }
+
+  private async fetchNextPage(dataKey: string): Promise<any[]> {
+    const cursor = this.cursors[dataKey];
+    const rows = this.rowsOf(dataKey);
+    if (!cursor || !rows) return [];
+
+    const token = await getCurrentUserToken();
+    const page = await this.fetchPage(token!, this.urlMap[dataKey], cursor);
+    if (!page.response.ok) {
+      throw new Error(`Failed to fetch more data for ${dataKey}`);
+    }
+
+    const cached = new Set(rows.map((row: any) => row.id));
+    const body = Array.isArray(page.body) ? page.body : page.body.data;
+    const added = body.filter((row: any) => !cached.has(row.id));
+
+    rows.push(...added);
+    this.cursors[dataKey] = page.response.headers.get("X-Next-Cursor");
+    return added;
+  }
+
+  // Caches are either bare arrays or objects carrying a `data` array
+  private rowsOf(dataKey: string): any[] | null {
+    const cache = this.dataCache[dataKey];
+    if (Array.isArray(cache)) return cache;
+    return cache && Array.isArray(cache.data) ? cache.data : null;
+  }
+
+  public async fetchPage(
+    token: string,
+    url: string,
+    cursor: string | null = null,
+    limit: number = SocketDataManager.pageSize
+  ): Promise<{ response: Response; body: any }> {
+    const params = new URLSearchParams({ limit: String(limit) });
+    if (cursor) {
+      params.set("cursor", cursor);
+    }
+
+    const response = await fetch(
+      `${url}${url.includes("?") ? "&" : "?"}${params}`,
+      {
+        headers: {
+          Authorization: `Bearer ${token}`,
+        },
+      }
+    );
+    return { response, body: response.ok ? await response.json() : null };
+  }
+
   public setEventCallback(
     dataKey: string,
     eventType: EventType,
@@ -189,72 +279,171 @@ export class SocketDataManager {
   }
 
   public subscribe(): void {
-    this.socket.on("data-change", (payload: EventPayload) => {
-      console.log("Subscribed to data change");
-      const { uid, dtype, type, data } = payload;
-
-      if (uid && dtype && type && data) {
-        const d = JSON.parse(data);
-
-        switch (type) {
-          case "modify":
-            if (this.dataCache[dtype]) {
-              const updatedItem = d;
-              this.updateCache(dtype, updatedItem);
-            }
-            break;
+    // Changes arrive in batches, buffered and coalesced per data key
+    this.socket.on("data-changes", async (payloads: EventPayload[]) => {
+      for (const payload of payloads) {
+        await this.handleDataChange(payload);
+      }
+    });
+  }
 
-          case "delete":
-            if (this.dataCache[dtype]) {
-              const itemId = d.id;
-              this.deleteFromCache(dtype, itemId);
-            }
-            break;
+  private async handleDataChange(payload: EventPayload): Promise<void> {
+    const { uid, dtype, type, data, seq, delta } = payload;
 
-          case "add":
-            if (this.dataCache[dtype]) {
-              const newItem = d;
-              this.addToCache(dtype, newItem);
+    if (!(uid && dtype && type && data)) {
+      console.error("Invalid payload structure:", payload);
+      return;
+    }
+
+    if (this.resyncs[dtype]) {
+      await this.resyncs[dtype];
+    }
+
+    // Events are numbered per data key; a gap means some were missed
+    const last = this.sequences[dtype];
+    if (seq !== undefined && last !== undefined) {
+      if (seq <= last) return;
+      if (seq !== last + 1) {
+        await this.resync(dtype);
+        return;
+      }
+    }
+
+    let d = JSON.parse(data);
+
+    switch (type) {
+      case "modify":
+        if (this.dataCache[dtype]) {
+          const updatedItem = this.updateCache(dtype, d, !!delta);
+          if (delta && !updatedItem) {
+            // Items on pages not loaded yet are fetched fresh with their page
+            if (this.hasMore(dtype)) {
+              if (seq !== undefined) this.sequences[dtype] = seq;
+              return;
             }
-            break;
+            // A delta cannot be applied to an item that is not cached
+            await this.reload(dtype);
+            return;
+          }
+          d = updatedItem ?? d;
+        }
+        break;
 
-          default:
-            console.error(`Unhandled data change type: ${type}`);
-            break;
+      case "delete":
+        if (this.dataCache[dtype]) {
+          const itemId = d.id;
+          this.deleteFromCache(dtype, itemId);
         }
+        break;
+
+      case "add":
+        if (this.dataCache[dtype]) {
+          const newItem = d;
+          this.addToCache(dtype, newItem);
+        }
+        break;
+
+      default:
+        console.error(`Unhandled data change type: ${type}`);
+        break;
+    }
+
+    if (seq !== undefined) {
+      this.sequences[dtype] = seq;
+    }
+
+    const eventKey = `${dtype}:${type}`;
+    const event = new CustomEvent(eventKey, {
+      detail: { uid, dtype, type, data: d },
+    });
+    window.dispatchEvent(event);
+
+    if (this.eventCallbacks[dtype] && this.eventCallbacks[dtype][type]) {
+      this.eventCallbacks[dtype][type](
+        uid,
+        d,
+        this.dataCache[dtype],
+        dtype,
+        type
+      );
+    }
+
+    if (this.eventCallbacks[dtype] && this.eventCallbacks[dtype]["change"]) {
+      this.eventCallbacks[dtype]["change"](
+        uid,
+        d,
+        this.dataCache[dtype],
+        dtype,
+        type
+      );
+    }
+  }
+
+  public async fetchEvents(
+    token: string,
+    dataKey: string,
+    since: number | null = null
+  ): Promise<{ seq: number; events?: EventPayload[]; reset?: boolean }> {
+    const query = since === null ? "" : `?since=${since}`;
+    const response = await fetch(`/resync_data/${dataKey}${query}`, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`Failed to fetch data changes for ${dataKey}`);
+    }
+    return response.json();
+  }
 
-        const eventKey = `${dtype}:${type}`;
-        const event = new CustomEvent(eventKey, {
-          detail: { uid, dtype, type, data: d },
-        });
-        window.dispatchEvent(event);
-
-        if (this.eventCallbacks[dtype] && this.eventCallbacks[dtype][type]) {
-          this.eventCallbacks[dtype][type](
-            uid,
-            d,
-            this.dataCache[dtype],
-            dtype,
-            type
-          );
+  // Replays the missed events of a data key, or reloads it if they are gone
+  private resync(dataKey: string): Promise<void> {
+    const resync = (async () => {
+      try {
+        const token = await getCurrentUserToken();
+        const result = await this.fetchEvents(
+          token!,
+          dataKey,
+          this.sequences[dataKey]
+        );
+        delete this.resyncs[dataKey];
+
+        if (result.reset) {
+          await this.reload(dataKey);
+          return;
         }
 
-        if (
-          this.eventCallbacks[dtype] &&
-          this.eventCallbacks[dtype]["change"]
-        ) {
-          this.eventCallbacks[dtype]["change"](
-            uid,
-            d,
-            this.dataCache[dtype],
-            dtype,
-            type
-          );
+        for (const event of result.events ?? []) {
+          await this.handleDataChange(event);
         }
-      } else {
-        console.error("Invalid payload structure:", payload);
+      } catch (error) {
+        console.error(`Failed to resync ${dataKey}:`, error);
+      } finally {
+        delete this.resyncs[dataKey];
       }
-    });
+    })();
+
+    this.resyncs[dataKey] = resync;
+    return resync;
+  }
+
+  private async reload(dataKey: string): Promise<void> {
+    const token = await getCurrentUserToken();
+    await this.fetchKeyData(token!, dataKey);
+
+    if (
+      this.eventCallbacks[dataKey] &&
+      this.eventCallbacks[dataKey]["reconnect"]
+    ) {
+      this.eventCallbacks[dataKey]["reconnect"](
+        null,
+        null,
+        this.dataCache[dataKey] || null,
+        dataKey,
+        "reconnect"
+      );
+    }
   }
 
   public getDataCache(dtype: string): any {
@@ -267,28 +456,32 @@ export class SocketDataManager {
   }
 
   // Helper methods to update, delete, and modify the cache
-  private updateCache(dtype: string, updatedItem: any): void {
-    const existingData = this.dataCache[dtype];
-    if (existingData && Array.isArray(existingData)) {
-      const index = existingData.findIndex(
-        (item: any) => item.id === updatedItem.id
-      );
+  private updateCache(
+    dtype: string,
+    updatedItem: any,
+    delta: boolean = false
+  ): any {
+    const rows = this.rowsOf(dtype);
+    if (rows) {
+      const index = rows.findIndex((item: any) => item.id === updatedItem.id);
       if (index !== -1) {
-        // Update the item in the array
-        existingData[index] = updatedItem;
+        // Deltas only carry the changed fields
+        rows[index] = delta ? { ...rows[index], ...updatedItem } : updatedItem;
+        return rows[index];
       }
     } else {
       console.warn(`No data found in cache for dtype: ${dtype}`);
     }
+    return null;
   }
 
   private deleteFromCache(dtype: string, itemId: string): void {
-    const existingData = this.dataCache[dtype];
-    if (existingData && Array.isArray(existingData)) {
-      const index = existingData.findIndex((item: any) => item.id === itemId);
+    const rows = this.rowsOf(dtype);
+    if (rows) {
+      const index = rows.findIndex((item: any) => item.id === itemId);
       if (index !== -1) {
         // Remove the item from the array
-        existingData.splice(index, 1);
+        rows.splice(index, 1);
       }
     } else {
       console.warn(`No data found in cache for dtype: ${dtype}`);
@@ -296,20 +489,28 @@ export class SocketDataManager {
   }
 
   private addToCache(dtype: string, newItem: any): void {
-    const existingData = this.dataCache[dtype];
-    if (existingData && Array.isArray(existingData)) {
-      existingData.push(newItem);
+    const rows = this.rowsOf(dtype);
+    if (rows) {
+      const index = rows.findIndex((item: any) => item.id === newItem.id);
+      if (index !== -1) {
+        rows[index] = newItem;
+      } else {
+        rows.push(newItem);
+      }
     } else {
       console.warn(`No data found in cache for dtype: ${dtype}`);
     }
   }
 
   public unsubscribe(): void {
-    this.socket.off("data-change");
+    this.socket.off("data-changes");
     this.dataKeys = [];
     this.eventCallbacks = {};
     this.urlMap = {};
     this.dataCache = {};
+    this.sequences = {};
+    this.cursors = {};
+    this.loading = {};
     console.warn("Data change unsubscribed and all resource freed");
   }
 
@@ -262,6 +262,16 @@ export async function initUsers() {
         const table = settings.oInstance.api();
         table.rows.add(Object.values(initialData)).draw();
 
+        TableAction.attachPageLoader({
+          table: table,
+          hasMore: () => dataManager.hasMore("users"),
+          loadMore: async () => {
+            const rows = await dataManager.loadMore("users");
+            await preFetchAndCacheImages(rows);
+            return rows;
+          },
+        });
+
         TableAction.attachListeners({
           selector: "tr .edit-icon",
           table: table,
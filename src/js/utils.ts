@@ -345,6 +345,42 @@ export class TableAction {
     });
   }
 
+  /**
+   * Loads more rows into a table whenever it is drawn on its last page, so
+   * that a paginated dataset is only fetched as far as the user pages.
+   * @param table - The DataTable API instance to load rows into.
+   * @param hasMore - Returns whether more rows can be loaded.
+   * @param loadMore - Loads and returns the next rows.
+   */
+  static attachPageLoader({
+    table,
+    hasMore,
+    loadMore,
+  }: {
+    table: Api<any>;
+    hasMore: () => boolean;
+    loadMore: () => Promise<any[]>;
+  }): void {
+    let loading = false;
+
+    table.on("draw", async function () {
+      const info = table.page.info();
+      if (loading || !hasMore() || info.page < info.pages - 1) {
+        return;
+      }
+
+      loading = true;
+      try {
+        const rows = await loadMore();
+        table.rows.add(rows).draw(false);
+      } catch (error) {
+        console.error("Failed to load more rows:", error);
+      } finally {
+        loading = false;
+      }
+    });
+  }
+
   /**
    * Generates a string of HTML attributes from a key-value object.
    * @param attributes - A record of attribute names and values.
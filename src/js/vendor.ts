@@ -28,7 +28,25 @@ interface Vendor {
   category: string[];
 }
 
-export const showReviews = (
+const reviewPageSize = 50;
+
+const fetchReviews = async (vendorId: string): Promise<any[]> => {
+  const response = await fetch(
+    `/get_vendor_reviews/${vendorId}?order=desc&limit=${reviewPageSize}`,
+    {
+      headers: {
+        Authorization: `Bearer ${await getCurrentUserToken()}`,
+      },
+    }
+  );
+
+  if (!response.ok) {
+    throw new Error(`Failed to fetch reviews of vendor ${vendorId}`);
+  }
+  return response.json();
+};
+
+export const showReviews = async (
   d: any,
   reviewTemplate: HTMLTemplateElement,
   list: HTMLElement
@@ -53,7 +71,9 @@ export const showReviews = (
       className: colorClass,
     },
   ]);
-  d.reviews.forEach((review: any, index: number) => {
+  const reviews = await fetchReviews(d.id);
+  list.replaceChildren();
+  reviews.forEach((review: any, index: number) => {
     const reviewElement: HTMLElement = (
       reviewTemplate.content.cloneNode(true) as HTMLElement
     ).firstElementChild as HTMLElement;
@@ -103,6 +123,23 @@ export const showReviews = (
   initMDB({ Collapse });
 };
 
+export const openReviews = async (
+  d: any,
+  reviewTemplate: HTMLTemplateElement,
+  list: HTMLElement,
+  modal: Modal
+) => {
+  try {
+    await showReviews(d, reviewTemplate, list);
+    modal.show();
+  } catch (e: any) {
+    showMessage(e.message, {
+      type: MessageType.DANGER,
+      element: "#content-container",
+    });
+  }
+};
+
 export async function initVendor() {
   return new Promise<() => void>(async (resolve, reject) => {
     await withBlock("#content", {
@@ -512,14 +549,19 @@ export async function initVendor() {
         initComplete: (settings, json) => {
           const table = settings.oInstance.api();
           table.rows.add(initialData.data).draw();
+
+          TableAction.attachPageLoader({
+            table: table,
+            hasMore: () => dataManager.hasMore("vendor"),
+            loadMore: () => dataManager.loadMore("vendor"),
+          });
           table.responsive.recalc();
 
           TableAction.attachListeners({
             selector: "tr .gred-icon",
             table: table,
             callback(this, event, d) {
-              showReviews(d, reviewTemplate, reviewList);
-              reviewModal.show();
+              openReviews(d, reviewTemplate, reviewList, reviewModal);
             },
           });
 
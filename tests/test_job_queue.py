@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "python"))
+
+from jobs import JobQueue
+
+
+class JobQueueClaimTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "jobs.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_running_key_is_not_claimed_twice(self):
+        first, second = JobQueue(self.path), JobQueue(self.path)
+
+        first.enqueue("assess_vendor", "v1", {"attempt": 1})
+        running = first.claim()
+        self.assertEqual(running["payload"], {"attempt": 1})
+
+        second.enqueue("assess_vendor", "v1", {"attempt": 2})
+        self.assertIsNone(second.claim())
+        self.assertIsNone(first.claim())
+
+        first.complete(running["id"])
+        claimed = second.claim()
+        self.assertEqual(claimed["payload"], {"attempt": 2})
+
+    def test_other_keys_are_still_claimed(self):
+        first, second = JobQueue(self.path), JobQueue(self.path)
+
+        first.enqueue_many("assess_vendor", [("v1", {}), ("v2", {})])
+        first.claim()
+        second.enqueue("assess_vendor", "v1", {})
+
+        claimed = second.claim_many(limit=2)
+        self.assertEqual([job["key"] for job in claimed], ["v2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
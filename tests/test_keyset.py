@@ -0,0 +1,52 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "python"))
+
+from database import Vendor, db, iter_keyset, keyset_page
+from flask import Flask
+
+IDS = ["7", "98", "99", "100", "1000", "101", "9"]
+
+
+class KeysetPaginationTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        db.session.add_all(Vendor(id=id, name=f"Vendor {id}") for id in IDS)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def ids(self, rows):
+        return [row.id for row in rows]
+
+    def test_pages_follow_numeric_order_across_id_lengths(self):
+        expected = sorted(IDS, key=int)
+
+        pages, cursor = [], None
+        while True:
+            rows, cursor = keyset_page(Vendor.query, Vendor.id, cursor, 2)
+            pages.extend(self.ids(rows))
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, expected)
+
+    def test_descending_batches_follow_numeric_order(self):
+        rows = iter_keyset(Vendor.query, Vendor.id, 3, descending=True)
+        self.assertEqual(self.ids(rows), sorted(IDS, key=int, reverse=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import os
+import sys
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "python"))
+
+from database import Category, Review, Vendor, db
+from flask import Flask
+from sqlalchemy import event
+
+
+class VendorPayloadQueryCountTest(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+        db.init_app(self.app)
+
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.statements = []
+        event.listen(db.engine, "before_cursor_execute", self.count)
+
+    def tearDown(self):
+        event.remove(db.engine, "before_cursor_execute", self.count)
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def count(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def add_vendors(self, count):
+        categories = [Category(id=id, name=f"Category {id}") for id in range(1, 4)]
+        db.session.add_all(categories)
+
+        for index in range(count):
+            vendor = Vendor(id=f"v{index}", name=f"Vendor {index}", gred=index)
+            vendor.categories = categories[: index % 3 + 1]
+            vendor.reviews = [
+                Review(
+                    id=f"v{index}-r{review}",
+                    rating=review + 1,
+                    caption="Good",
+                    date=datetime(2024, 1, review + 1),
+                )
+                for review in range(3)
+            ]
+            db.session.add(vendor)
+
+        db.session.commit()
+        db.session.expunge_all()
+
+    def serialize_vendors(self):
+        self.statements.clear()
+        data = Vendor.summaries(Vendor.with_payload().all())
+        return data, len(self.statements)
+
+    def test_single_vendor(self):
+        self.add_vendors(1)
+        data, queries = self.serialize_vendors()
+
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["categories"], ["Category 1"])
+        self.assertEqual(data[0]["review_count"], 3)
+        self.assertEqual(queries, 3)
+
+    def test_query_count_does_not_grow_with_vendors(self):
+        self.add_vendors(50)
+        data, queries = self.serialize_vendors()
+
+        self.assertEqual(len(data), 50)
+        self.assertTrue(all(vendor["review_count"] == 3 for vendor in data))
+        self.assertEqual(queries, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()